@@ -0,0 +1,126 @@
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+
+from prototypes import *
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed mod data.
+    Every mod gets its own directory holding one pickle per data kind. An entry is only
+    used while the fingerprints of its source files and the property_def schemas still
+    match. Whole mods are evicted least-recently-used first once the cache outgrows max_size.
+    """
+    # bump when the pickled classes change in a way property_def doesn't show
+    FORMAT_VERSION = 2
+    DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+    # directory of the per-user cache root, shared by the GUI and cli.py
+    DIR_NAME = "starsector-translator"
+
+    @staticmethod
+    def default_dir() -> str:
+        """
+        %LOCALAPPDATA% on Windows, $XDG_CACHE_HOME or ~/.cache elsewhere, never the program directory.
+        """
+        if os.name == "nt":
+            root = os.environ.get("LOCALAPPDATA") or os.path.expanduser(r"~\AppData\Local")
+        else:
+            root = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        return os.path.join(root, ParseCache.DIR_NAME, "parse")
+
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_MAX_SIZE):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.schema = ParseCache.schema_version()
+
+    @staticmethod
+    def schema_version() -> str:
+        schemas = [ParseCache.FORMAT_VERSION]
+        for cls in (ShipHull, Weapon, ShipSystem, HullMod, Faction, Resource):
+            schemas.append((cls.__name__, cls.property_def))
+        return hashlib.sha1(repr(schemas).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def fingerprints(file_paths: list[str]) -> tuple:
+        """
+        :param file_paths: source files of one cache entry
+        :return: ((absolute path, size, mtime_ns), ...), size and mtime are None for missing files
+        """
+        result = []
+        for file_path in file_paths:
+            try:
+                stat = os.stat(file_path)
+                result.append((os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                result.append((os.path.abspath(file_path), None, None))
+        return tuple(result)
+
+    def get(self, mod_path: str, kind: str, fingerprints: tuple):
+        """
+        :return: cached data, or None when missing or out of date
+        """
+        entry_path = self.__entry_path(mod_path, kind)
+        try:
+            with open(entry_path, "rb") as file:
+                entry = pickle.load(file)
+            # mark mod as recently used
+            os.utime(os.path.dirname(entry_path))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning("parse cache(%s) unreadable: %s", entry_path, e)
+            return None
+        if entry.get("schema") != self.schema or entry.get("sources") != fingerprints:
+            return None
+        return entry.get("data")
+
+    def put(self, mod_path: str, kind: str, fingerprints: tuple, data):
+        """
+        :param fingerprints: taken before the sources were parsed
+        """
+        entry_path = self.__entry_path(mod_path, kind)
+        temp_path = entry_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            with open(temp_path, "wb") as file:
+                pickle.dump({"schema": self.schema, "sources": fingerprints, "data": data}, file,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, entry_path)
+        except Exception as e:
+            logging.warning("parse cache(%s) write failed: %s", entry_path, e)
+            return
+        self.__evict(keep=os.path.dirname(entry_path))
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def __entry_path(self, mod_path: str, kind: str) -> str:
+        mod_key = hashlib.sha1(os.path.abspath(mod_path).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, mod_key, kind + ".pickle")
+
+    def __evict(self, keep: str):
+        mods = []
+        total = 0
+        try:
+            for entry in os.scandir(self.cache_dir):
+                if not entry.is_dir():
+                    continue
+                size = sum(file.stat().st_size for file in os.scandir(entry.path) if file.is_file())
+                mods.append((entry.stat().st_mtime_ns, entry.path, size))
+                total += size
+        except OSError as e:
+            logging.warning("parse cache(%s) scan failed: %s", self.cache_dir, e)
+            return
+        # least recently used first
+        mods.sort()
+        for _, mod_dir, size in mods:
+            if total <= self.max_size:
+                break
+            if os.path.samefile(mod_dir, keep):
+                continue
+            shutil.rmtree(mod_dir, ignore_errors=True)
+            total -= size
@@ -0,0 +1,309 @@
+"""
+Command line entry for build servers and bulk jobs, no Qt involved.
+
+    python cli.py export <mod_path> <file.translate>
+    python cli.py apply <mod_path> <file.translate>
+    python cli.py coverage [--strict] <mod_path> <file.translate>
+    python cli.py batch-apply <mods_root> <translate_dir>
+    python cli.py convert <source> <target>
+"""
+import argparse
+import errno
+import glob
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import inject
+from cache import ParseCache
+from loader import ModLoader
+from parse import ModParser
+from prototypes import DataHolder
+from store import STORE_SUFFIX, TranslationStore
+from table import ENTITY_TABLES
+
+# translate category -> DataHolder attribute holding its entities
+COVERAGE_PARTS = {
+    "WEAPON": "weapons",
+    "SHIP": "ship_hulls",
+    "SHIP_SYSTEM": "ship_systems",
+    "HULLMOD": "hullmods",
+}
+
+
+def load_translates(file_path) -> dict:
+    """
+    :raise FileNotFoundError: file_path doesn't exist, a translation store is not created for it
+    """
+    if file_path.endswith(STORE_SUFFIX):
+        store = TranslationStore(file_path)
+        try:
+            return {category: dict(group.items()) for category, group in store.translates().items()}
+        finally:
+            store.close()
+    with open(file_path, "r", encoding="utf-8") as file:
+        return ModParser.loads_json(file.read(), file_path)
+
+
+def export_originals(mod_path, file_path):
+    inject.recover_apply(mod_path)
+    data_holder = ModLoader().load(mod_path, parts=["descriptions", "weapons", "ship_hulls",
+                                                    "ship_systems", "metadata"])
+    inject.export_data_as_translate(file_path, data_holder)
+
+
+def apply_translates(mod_path, file_path, force: bool = False) -> list[str]:
+    """
+    :param force: rewrite files whose translations didn't change as well
+    :return: paths of the skipped files
+    :raise ValueError: a file could not be translated, the mod is left as it was
+    """
+    data_holder = DataHolder(mod_path=mod_path)
+    data_holder.translates = load_translates(file_path)
+    return inject.apply_translation(data_holder, force)
+
+
+def convert_translates(source, target):
+    """
+    Convert between .translate files and translation stores, the suffix of each path tells its format.
+    """
+    if source.endswith(STORE_SUFFIX) == target.endswith(STORE_SUFFIX):
+        raise ValueError("one of (%s, %s) must be a %s store" % (source, target, STORE_SUFFIX))
+    if target.endswith(STORE_SUFFIX):
+        if not os.path.isfile(source):
+            raise FileNotFoundError(errno.ENOENT, "translate file not found", source)
+        store = TranslationStore(target, create=True)
+        try:
+            store.import_json(source)
+        finally:
+            store.close()
+    else:
+        store = TranslationStore(source)
+        try:
+            store.export_json(target)
+        finally:
+            store.close()
+
+
+def match_translates(mods_root, translate_dir) -> tuple[list[tuple[str, str, str]], list[str]]:
+    """
+    Pair mods with .translate files by mod id, the MOD_META id of a translate file or else its file name.
+    :return: [(mod id, mod path, translate file), ...], [mods or translate files left unmatched, ...]
+    """
+    translate_files = {}
+    unmatched = []
+    for file_path in sorted(glob.glob(os.path.join(translate_dir, "*.translate"))):
+        try:
+            mod_id = (load_translates(file_path).get("MOD_META") or {}).get("id")
+        except (OSError, ValueError) as e:
+            logging.warning("translate file(%s) unreadable: %s", file_path, e)
+            unmatched.append(file_path)
+            continue
+        translate_files[mod_id or os.path.splitext(os.path.basename(file_path))[0]] = file_path
+
+    matched = []
+    for entry in sorted(os.scandir(mods_root), key=lambda entry: entry.name):
+        if not entry.is_dir() or not os.path.isfile(DataHolder(mod_path=entry.path).mod_info_path):
+            continue
+        try:
+            metadata = ModParser.parse_metadata(entry.path)[0]
+        except (ValueError, KeyError) as e:
+            logging.warning("mod_info.json of (%s) parse failed: %s", entry.path, e)
+            metadata = None
+        file_path = translate_files.pop(metadata.id, None) if metadata else None
+        if file_path is None:
+            unmatched.append(entry.path)
+        else:
+            matched.append((metadata.id, entry.path, file_path))
+    unmatched.extend(translate_files.values())
+    return matched, unmatched
+
+
+def _apply_timed(mod_path, file_path, force) -> tuple[str | None, int, float]:
+    # runs in a worker process, report failures instead of raising them
+    start = time.perf_counter()
+    skipped = 0
+    try:
+        skipped = len(apply_translates(mod_path, file_path, force))
+        error = None
+    except Exception as e:
+        error = "%s: %s" % (type(e).__name__, e)
+    return error, skipped, time.perf_counter() - start
+
+
+def _apply_isolated(mod_path, file_path, force) -> tuple[str | None, int, float]:
+    # a process of its own, when it dies only this job fails
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(_apply_timed, mod_path, file_path, force).result()
+
+
+def batch_apply(jobs: list[tuple[str, str, str]], max_workers: int | None = None,
+                force: bool = False) -> list[tuple[str, str, int, float]]:
+    """
+    Apply every job of match_translates on its own worker process, one failing mod doesn't stop the others.
+    A worker that dies breaks the whole pool, the jobs not finished then are run again one process each.
+    :return: [(mod id, error or None, files skipped, seconds), ...] in job order
+    """
+    results = {}
+    broken = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_apply_timed, mod_path, file_path, force): (mod_id, mod_path, file_path)
+                   for mod_id, mod_path, file_path in jobs}
+        for future in as_completed(futures):
+            try:
+                results[futures[future][0]] = future.result()
+            except BrokenProcessPool:
+                # which job killed its worker is unknown, apply_translation rolls back what was cut short
+                broken.append(futures[future])
+            except Exception as e:
+                results[futures[future][0]] = ("%s: %s" % (type(e).__name__, e), 0, 0.0)
+    if broken:
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as threads:
+            futures = {threads.submit(_apply_isolated, mod_path, file_path, force): mod_id
+                       for mod_id, mod_path, file_path in broken}
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    # worker process died
+                    results[futures[future]] = ("%s: %s" % (type(e).__name__, e), 0, 0.0)
+    return [(mod_id, *results[mod_id]) for mod_id, _, _ in jobs]
+
+
+def translation_coverage(mod_path, translates: dict) -> dict[str, tuple[int, int, int] | None]:
+    """
+    :return: category -> (entities translated, entities in mod, translations of ids not in mod),
+             None for categories whose csv is not in the mod
+    """
+    inject.recover_apply(mod_path)
+    # only ids are compared, skip merging description texts
+    entities = ModLoader(lazy=True).parse(mod_path, COVERAGE_PARTS.values(), descriptions={})
+    result = {}
+    for category, part in COVERAGE_PARTS.items():
+        if not os.path.isfile(os.path.join(mod_path, ENTITY_TABLES[category].file_path)):
+            result[category] = None
+            continue
+        ids = entities.get(part) or {}
+        translations = translates.get(category) or {}
+        translated = sum(1 for entity_id in ids
+                         if any(value for value in (translations.get(entity_id) or {}).values()))
+        stale = sum(1 for entity_id in translations if entity_id not in ids)
+        result[category] = (translated, len(ids), stale)
+    return result
+
+
+def _export(args) -> int:
+    export_originals(args.mod_path, args.translate_file)
+    print("exported %s -> %s" % (args.mod_path, args.translate_file))
+    return 0
+
+
+def _apply(args) -> int:
+    try:
+        skipped = apply_translates(args.mod_path, args.translate_file, args.force)
+    except Exception as e:
+        print("apply failed: %s" % e, file=sys.stderr)
+        return 1
+    print("applied %s -> %s" % (args.translate_file, args.mod_path))
+    for path in skipped:
+        print("unchanged, skipped %s" % path)
+    return 0
+
+
+def _coverage(args) -> int:
+    try:
+        translates = load_translates(args.translate_file)
+    except Exception as e:
+        print("coverage failed: %s" % e, file=sys.stderr)
+        return 1
+    coverage = translation_coverage(args.mod_path, translates)
+    print("%-12s %17s %8s %6s" % ("category", "translated", "", "stale"))
+    missing = 0
+    for category, counts in coverage.items():
+        if counts is None:
+            print("%-12s %17s" % (category, "file missing"))
+            print("file(%s) not found" % os.path.join(args.mod_path, ENTITY_TABLES[category].file_path),
+                  file=sys.stderr)
+            missing += 1
+            continue
+        translated, total, stale = counts
+        percent = 100.0 * translated / total if total else 100.0
+        print("%-12s %8d / %-6d %7.1f%% %6d" % (category, translated, total, percent, stale))
+    # most mods leave out some of the csv files
+    return 1 if missing and args.strict else 0
+
+
+def _convert(args) -> int:
+    try:
+        convert_translates(args.source, args.target)
+    except (OSError, ValueError) as e:
+        print("convert failed: %s" % e, file=sys.stderr)
+        return 1
+    print("converted %s -> %s" % (args.source, args.target))
+    return 0
+
+
+def _batch_apply(args) -> int:
+    jobs, unmatched = match_translates(args.mods_root, args.translate_dir)
+    start = time.perf_counter()
+    results = batch_apply(jobs, args.workers, args.force)
+    failed = 0
+    for mod_id, error, skipped, seconds in results:
+        print("%-30s %-6s %7.2fs %s" % (mod_id, "failed" if error else "ok", seconds,
+                                        error or ("%d unchanged file(s) skipped" % skipped if skipped else "")))
+        failed += error is not None
+    for path in unmatched:
+        print("%-30s %-6s %8s %s" % ("-", "skip", "", path))
+    print("%d applied, %d failed, %d unmatched in %.2fs"
+          % (len(results) - failed, failed, len(unmatched), time.perf_counter() - start))
+    return 1 if failed else 0
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    arg_parser = argparse.ArgumentParser(description="Starsector mod translate tool, headless.")
+    arg_parser.add_argument("--no-cache", action="store_true", help="parse every file, skip the parse cache")
+    arg_parser.add_argument("--cache-dir", default=ParseCache.default_dir(),
+                            help="parse cache shared with the GUI by default (%(default)s)")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("export", help="export original texts of a mod to a .translate file")
+    command.set_defaults(run=_export)
+    command = commands.add_parser("apply", help="write a .translate file into the data files of a mod")
+    command.set_defaults(run=_apply)
+    command.add_argument("--force", action="store_true", help="rewrite files whose translations didn't change")
+    command = commands.add_parser("coverage", help="report how much of a mod a .translate file covers")
+    command.set_defaults(run=_coverage)
+    command.add_argument("--strict", action="store_true", help="exit with 1 when a csv of the report is missing")
+    for command in commands.choices.values():
+        command.add_argument("mod_path")
+        command.add_argument("translate_file")
+
+    command = commands.add_parser("batch-apply", help="apply the .translate files of a directory to the mods "
+                                                      "of a mods root, matched by mod id")
+    command.set_defaults(run=_batch_apply)
+    command.add_argument("mods_root")
+    command.add_argument("translate_dir")
+    command.add_argument("--workers", type=int, default=None, help="worker processes, one per cpu by default")
+    command.add_argument("--force", action="store_true", help="rewrite files whose translations didn't change")
+
+    command = commands.add_parser("convert", help="convert a .translate file to a %s translation store "
+                                                  "or back" % STORE_SUFFIX)
+    command.set_defaults(run=_convert)
+    command.add_argument("source")
+    command.add_argument("target")
+    return arg_parser
+
+
+def main(argv=None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    if not args.no_cache:
+        ModParser.cache = ParseCache(args.cache_dir)
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
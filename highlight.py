@@ -0,0 +1,123 @@
+"""
+Highlighted text in its game forms and in the {{ }} markup of the editor.
+
+percent form: "Deals %s damage for %s seconds" + "20% | 3"   (weapon customPrimary/customPrimaryHL)
+inline form:  "Boosts speed by 50% for 3 s" + "50% | 3 s"    (ship system text3/text4 of descriptions.csv)
+markup:       "Deals {{20%}} damage for {{3}} seconds"
+
+encode_* turns markup into a game form, decode_* turns a game form back into markup and render_*
+turns it into the html the editor shows. Patterns are compiled once, every function is linear in the text.
+"""
+import re
+
+SEPARATOR = " | "
+_markup_pattern = re.compile(r"\{\{(.+?)\}\}")
+_brace_pattern = re.compile(r"\{\{|\}\}")
+
+
+def split_highlights(highlights: str) -> list[str]:
+    """
+    "20% | 3" -> ["20%", "3"], spaces around the separator are not part of a highlight
+    """
+    if not highlights:
+        return []
+    split = list(map(str.strip, highlights.split("|")))
+    if "" in split:
+        split = [highlight for highlight in split if highlight]
+    return split
+
+
+def encode_percent(markup: str) -> (str, str):
+    """
+    "a {{b}} c" -> ("a %s c", "b")
+    """
+    return _markup_pattern.sub("%s", markup), SEPARATOR.join(_markup_pattern.findall(markup))
+
+
+def decode_percent(text: str, highlights: str) -> str:
+    """
+    ("a %s c", "b") -> "a {{b}} c", placeholders without highlight stay %s
+    """
+    # most texts have nothing to fill, skip the calls
+    if not highlights or "%s" not in text:
+        return text
+    return _fill_percent(text, highlights, "{{", "}}")
+
+
+def render_percent(text: str, highlights: str, color: str) -> str:
+    if not highlights or "%s" not in text:
+        return text
+    return _fill_percent(text, highlights, "<font color=" + color + ">", "</font>")
+
+
+def encode_inline(markup: str) -> (str, str):
+    """
+    "a {{b}} c" -> ("a b c", "b"), stray braces are dropped
+    """
+    return _brace_pattern.sub("", markup), SEPARATOR.join(_markup_pattern.findall(markup))
+
+
+def decode_inline(text: str, highlights: str) -> str:
+    """
+    ("a b c", "b") -> "a {{b}} c", highlights not found in the text are dropped
+    """
+    if not highlights or not text:
+        return text
+    return _wrap_spans(text, _inline_spans(text, split_highlights(highlights)), "{{", "}}")
+
+
+def render_inline(text: str, highlights: str, color: str) -> str:
+    if not highlights or not text:
+        return text
+    return _wrap_spans(text, _inline_spans(text, split_highlights(highlights)), "<font color=" + color + ">",
+                       "</font>")
+
+
+def _fill_percent(text: str, highlights: str, opening: str, closing: str) -> str:
+    parts = text.split("%s")
+    filled = parts[0]
+    index = 1
+    for highlight in split_highlights(highlights)[:len(parts) - 1]:
+        filled += opening + highlight + closing + parts[index]
+        index += 1
+    if index < len(parts):
+        # placeholders without highlight
+        filled += "%s" + "%s".join(parts[index:])
+    return filled
+
+
+def _inline_spans(text: str, highlights: list[str]) -> list[tuple[int, int]]:
+    # highlights are listed in text order, the same text may be highlighted more than once
+    spans = []
+    cursor = 0
+    ordered = True
+    for highlight in highlights:
+        start = text.find(highlight, cursor)
+        if start >= 0:
+            cursor = start + len(highlight)
+            spans.append((start, cursor))
+            continue
+        # listed out of order, take its first occurrence not highlighted yet
+        start = text.find(highlight)
+        while start >= 0 and any(start < end and begin < start + len(highlight) for begin, end in spans):
+            start = text.find(highlight, start + 1)
+        if start >= 0:
+            spans.append((start, start + len(highlight)))
+            cursor = max(cursor, start + len(highlight))
+            ordered = False
+    if not ordered:
+        spans.sort()
+    return spans
+
+
+def _wrap_spans(text: str, spans: list[tuple[int, int]], opening: str, closing: str) -> str:
+    if not spans:
+        return text
+    pieces = []
+    copied = 0
+    for start, end in spans:
+        pieces.append(text[copied:start])
+        pieces.append(opening + text[start:end] + closing)
+        copied = end
+    pieces.append(text[copied:])
+    return "".join(pieces)
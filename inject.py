@@ -1,275 +1,383 @@
-import copy
+import codecs
 import csv
+import hashlib
+import io
 import json
+import logging
+import mmap
 import os.path
-import re
 
-import chardet
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 import parse
 from prototypes import DataHolder
+from table import DESCRIPTION_TABLE, ENTITY_TABLES
+
+
+# write buffer of translate files, entities are encoded one by one into it
+EXPORT_BUFFER_SIZE = 1024 * 1024
+
+
+def write_translates(file_path, categories: dict):
+    """
+    Write a translate file one entity at a time, the output is what json.dump(translates) writes.
+    Nothing but the entity being encoded is held in memory.
+    :param categories: category -> iterable of (entity id or MOD_META key, value), e.g. a group's items()
+    """
+    # one C encoder call per entity, json.dump itself falls back to the pure python encoder
+    encode = json.JSONEncoder().encode
+    with open(file_path, "w", newline="", encoding="utf-8", buffering=EXPORT_BUFFER_SIZE) as save_file:
+        write = save_file.write
+        write("{")
+        separator = ""
+        for category, entries in categories.items():
+            write(separator + encode(category) + ": {")
+            entry_separator = ""
+            for key, value in entries:
+                write(entry_separator + encode(key) + ": " + encode(value))
+                entry_separator = ", "
+            write("}")
+            separator = ", "
+        write("}")
 
 
 def export_data_as_translate(file_path, data_holder: DataHolder):
-    with open(file_path, "w", newline="", encoding="utf-8") as save_file:
-        translates = copy.deepcopy(DataHolder.empty_translate)
-        # SAVE META
-        if data_holder.metadata is not None:
-            translates["MOD_META"] = {
-                "id": data_holder.metadata.id,
-                "name": data_holder.metadata.name,
-                "description": data_holder.metadata.description
-            }
-
-        for key, weapon in data_holder.weapons.items():
-            translates["WEAPON"][key] = {
-                "name": weapon.name,
-                "tech": weapon.tech,
-                "role": weapon.role,
-                "accuracy": weapon.accuracy,
-                "fly_speed": weapon.fly_speed,
-                "tracking": weapon.tracking,
-                "turn_rate": weapon.turn_rate,
-                "description": weapon.description,
-                "desc_foot_note": weapon.desc_foot_note,
-                "special_effect_1": weapon.special_effect_1_trans,
-                "special_effect_2": weapon.special_effect_2_trans
-            }
-        for key, hull in data_holder.ship_hulls.items():
-            translates["SHIP"][key] = {
-                "name": hull.hull_name,
-                "tech": hull.tech_manufacturer,
-                "role": hull.role,
-                "desc_long": hull.desc_long,
-                "desc_short": hull.desc_short,
-                "desc_fleet": hull.desc_fleet
-            }
-        for key, system in data_holder.ship_systems.items():
-            translates["SHIP_SYSTEM"][key] = {
-                "name": system.name,
-                "system_type": system.system_type,
-                "desc_in_codex": system.desc_in_codex,
-                "desc_on_ship": system.desc_on_ship_trans
-            }
-
-        json.dump(translates, save_file)
-
-
-def inject_ship_hull_csv(data_holder) -> str | None:
+    categories = dict.fromkeys(DataHolder.empty_translate, ())
+    # SAVE META
+    if data_holder.metadata is not None:
+        categories["MOD_META"] = {
+            "id": data_holder.metadata.id,
+            "name": data_holder.metadata.name,
+            "description": data_holder.metadata.description
+        }.items()
+
+    categories["WEAPON"] = ((key, {
+        "name": weapon.name,
+        "tech": weapon.tech,
+        "role": weapon.role,
+        "accuracy": weapon.accuracy,
+        "fly_speed": weapon.fly_speed,
+        "tracking": weapon.tracking,
+        "turn_rate": weapon.turn_rate,
+        "description": weapon.description,
+        "desc_foot_note": weapon.desc_foot_note,
+        "special_effect_1": weapon.special_effect_1_trans,
+        "special_effect_2": weapon.special_effect_2_trans
+    }) for key, weapon in data_holder.weapons.items())
+    categories["SHIP"] = ((key, {
+        "name": hull.hull_name,
+        "tech": hull.tech_manufacturer,
+        "role": hull.role,
+        "desc_long": hull.desc_long,
+        "desc_short": hull.desc_short,
+        "desc_fleet": hull.desc_fleet
+    }) for key, hull in data_holder.ship_hulls.items())
+    categories["SHIP_SYSTEM"] = ((key, {
+        "name": system.name,
+        "system_type": system.system_type,
+        "desc_in_codex": system.desc_in_codex,
+        "desc_on_ship": system.desc_on_ship_trans
+    }) for key, system in data_holder.ship_systems.items())
+
+    write_translates(file_path, categories)
+
+
+def inject_ship_hull_csv(data_holder, temp_path: str | None = None) -> str | None:
     """
     :param data_holder:
+    :param temp_path: where to write, the translate dir of the mod by default
     :return: absolute path of temp csv
     """
-    # inject ship_hull.csv:
-    try:
-        ship_csv_path = data_holder.mod_path + r"\data\hulls\ship_data.csv"
-        temp_path = data_holder.mod_path + r"\translate\ship_hull.csv_new"
-        make_translate_dir(data_holder.mod_path)
-        with open(temp_path, "w", newline='',
-                  encoding="utf-8") as translate_file:
-            writer = csv.writer(translate_file)
-            with open(ship_csv_path, "rb") as file:
-                encoding_check = chardet.detect(file.read())
-            with open(ship_csv_path, "r", encoding=encoding_check["encoding"]) as csv_file:
-                reader = csv.reader(csv_file)
-                header_row = next(reader)
-                id_col = header_row.index("id")
-                # write headers.
-                writer.writerow(header_row)
-                # write other rows
-                for row in reader:
-                    # empty row or annotation row
-                    if row[0].startswith("#") or len(row[id_col]) == 0:
-                        writer.writerow(row)
-                        continue
-                    else:
-                        # check translation
-                        translation = data_holder.translates["SHIP"].get(row[id_col])
-                        if translation is not None:
-                            translation_mapping = {
-                                "hull_name": r"name",
-                                "tech_manufacturer": r"tech/manufacturer",
-                                "ship_designation": r"designation"
-                            }
-                            # change records
-                            for key, value in translation_mapping.items():
-                                if len(translation[key]) > 0:
-                                    row[header_row.index(value)] = translation[key]
-                        writer.writerow(row)
-    except Exception as e:
-        return None
-    return temp_path
+    return _inject_table(data_holder, ENTITY_TABLES["SHIP"],
+                         temp_path or os.path.join(data_holder.mod_path, "translate", "ship_hull.csv_new"))
 
 
-def inject_weapon_csv(data_holder) -> str | None:
+def inject_weapon_csv(data_holder, temp_path: str | None = None) -> str | None:
     """
     :param data_holder:
+    :param temp_path: where to write, the translate dir of the mod by default
     :return: absolute path of temp csv
     """
-    # inject weapon_data.csv:
-    try:
-        origin_path = data_holder.mod_path + r"\data\weapons\weapon_data.csv"
-        temp_path = data_holder.mod_path + r"/translate/weapon_data.csv_new"
-        make_translate_dir(data_holder.mod_path)
-        with open(temp_path, "w", newline='', encoding="utf-8") as translate_file:
-            writer = csv.writer(translate_file)
-            with open(origin_path, "rb") as file:
-                encoding_check = chardet.detect(file.read())
-            with open(origin_path, "r", encoding=encoding_check["encoding"]) as csv_file:
-                reader = csv.reader(csv_file)
-                header_row = next(reader)
-                id_col = header_row.index("id")
-                # write headers.
-                writer.writerow(header_row)
-                # write other rows
-                for row in reader:
-                    # empty row or annotation row
-                    if row[0].startswith("#") or len(row[id_col]) == 0:
-                        writer.writerow(row)
-                        continue
-                    else:
-                        # check translation
-                        translation = data_holder.translates["WEAPON"].get(row[id_col])
-                        if translation is not None:
-                            translation_mapping = {
-                                "name": "name",
-                                "tech": "tech/manufacturer",
-                                "role": "primaryRoleStr",
-                                "accuracy": "accuracyStr",
-                                "fly_speed": "speedStr",
-                                "tracking": "trackingStr",
-                                "turn_rate": "turnRateStr"
-                            }
-                            # change records
-                            for key, value in translation_mapping.items():
-                                if len(translation[key]) > 0:
-                                    row[header_row.index(value)] = translation[key]
-                            if len(translation["special_effect_1"]) > 0:
-                                hi_lights = " | ".join(re.findall(r"\{\{(.+?)\}\}", translation["special_effect_1"]))
-                                text_origin = re.sub(r"\{\{.+?\}\}", "%s", translation["special_effect_1"])
-                                row[header_row.index("customPrimary")] = text_origin
-                                row[header_row.index("customPrimaryHL")] = hi_lights
-
-                            if len(translation["special_effect_2"]) > 0:
-                                hi_lights = " | ".join(re.findall(r"\{\{(.+?)\}\}", translation["special_effect_2"]))
-                                text_origin = re.sub(r"\{\{.+?\}\}", "%s", translation["special_effect_2"])
-                                row[header_row.index("customAncillary")] = text_origin
-                                row[header_row.index("customAncillaryHL")] = hi_lights
-
-                        writer.writerow(row)
-    except Exception:
-        return None
-    return temp_path
+    return _inject_table(data_holder, ENTITY_TABLES["WEAPON"],
+                         temp_path or os.path.join(data_holder.mod_path, "translate", "weapon_data.csv_new"))
 
 
-def inject_shipsystem_csv(data_holder) -> str | None:
+def inject_shipsystem_csv(data_holder, temp_path: str | None = None) -> str | None:
+    """
+    :param data_holder:
+    :param temp_path: where to write, the translate dir of the mod by default
+    :return: absolute path of temp csv
+    """
+    return _inject_table(data_holder, ENTITY_TABLES["SHIP_SYSTEM"],
+                         temp_path or os.path.join(data_holder.mod_path, "translate", "ship_systems.csv_new"))
+
+
+def inject_descriptions_csv(data_holder, temp_path: str | None = None) -> str | None:
+    """
+    :param data_holder:
+    :param temp_path: where to write, the translate dir of the mod by default
+    :return: absolute path of temp csv
+    """
+    return _inject_table(data_holder, DESCRIPTION_TABLE,
+                         temp_path or os.path.join(data_holder.mod_path, "translate", "descriptions.csv_new"))
+
+
+def _inject_table(data_holder, table, temp_path) -> str | None:
+    """
+    Write a translated copy of one csv of the mod.
+    :param table: EntityTable or DescriptionTable of the csv
+    :return: temp_path, None when the copy couldn't be written
     """
-        :param data_holder:
-        :return: absolute path of temp csv
-        """
-    # inject ship_system.csv:
     try:
-        csv_path = data_holder.mod_path + r"/data/shipsystems/ship_systems.csv"
-        new_path = data_holder.mod_path + r"/translate/ship_systems.csv_new"
+        csv_path = os.path.join(data_holder.mod_path, table.file_path)
         make_translate_dir(data_holder.mod_path)
-        with open(new_path, "w", newline='', encoding="utf-8") as translate_file:
-            writer = csv.writer(translate_file)
-            with open(csv_path, "rb") as file:
-                encoding_check = chardet.detect(file.read())
-            with open(csv_path, "r", encoding=encoding_check["encoding"]) as csv_file:
-                reader = csv.reader(csv_file)
-                header_row = next(reader)
-                id_col = header_row.index("id")
-                # write headers.
-                writer.writerow(header_row)
-                # write other rows
-                for row in reader:
-                    # empty row or annotation row
-                    if row[0].startswith("#") or len(row[id_col]) == 0:
-                        writer.writerow(row)
-                        continue
-                    else:
-                        # check translation
-                        translation = data_holder.translates["SHIP_SYSTEM"].get(row[id_col])
-                        if translation is not None:
-                            row[header_row.index("name")] = translation["name"]
-                        writer.writerow(row)
+        chunks = _splice_table(table, csv_path, data_holder.translates)
+        if chunks is not None:
+            with open(temp_path, "wb") as translate_file:
+                translate_file.writelines(chunks)
+                sync_file(translate_file)
+            return temp_path
+        # one read, the encoding detected while parsing is reused
+        source = io.StringIO(parse.ModParser.read_text(csv_path))
+        with open(temp_path, "w", newline='', encoding="utf-8") as translate_file:
+            table.inject(source, csv.writer(translate_file), data_holder.translates)
+            sync_file(translate_file)
     except Exception:
+        logging.exception("file(%s) translate failed", os.path.join(data_holder.mod_path, table.file_path))
         return None
-    return new_path
+    return temp_path
 
 
-def inject_descriptions_csv(data_holder) -> str | None:
-    try:
-        csv_path = data_holder.mod_path + r"/data/strings/descriptions.csv"
-        new_path = data_holder.mod_path + r"/translate/descriptions.csv_new"
-        make_translate_dir(data_holder.mod_path)
-        with open(new_path, "w", newline='', encoding="utf-8") as translate_file:
-            writer = csv.writer(translate_file)
-            with open(csv_path, "rb") as file:
-                encoding_check = chardet.detect(file.read())
-            with open(csv_path, "r", encoding=encoding_check["encoding"]) as csv_file:
-                reader = csv.reader(csv_file)
-                header_row = next(reader)
-                id_col = header_row.index("id")
-                type_col = header_row.index("type")
-                # write headers.
-                writer.writerow(header_row)
-                # write other rows
-                for row in reader:
-                    # empty row or annotation row
-                    if row[0].startswith("#") or len(row[id_col]) == 0:
-                        writer.writerow(row)
-                        continue
-                    else:
-                        translation = None
-                        translation_group = data_holder.translates.get(row[type_col])
-                        if translation_group is not None:
-                            translation = translation_group.get(row[id_col])
-                        if translation is not None:
-                            if row[type_col] == "SHIP":
-                                row[header_row.index("text1")] = translation["desc_long"]
-                                row[header_row.index("text2")] = translation["desc_short"]
-                                row[header_row.index("text3")] = translation["desc_fleet"]
-                            elif row[type_col] == "WEAPON":
-                                row[header_row.index("text1")] = translation["description"]
-                                row[header_row.index("text2")] = translation["desc_foot_note"]
-                            elif row[type_col] == "SHIP_SYSTEM":
-                                row[header_row.index("text1")] = translation["desc_in_codex"]
-                                row[header_row.index("text2")] = translation["system_type"]
-                                if len(translation["desc_on_ship"]) > 0:
-                                    hi_lights = " | ".join(re.findall(r"\{\{(.+?)\}\}", translation["desc_on_ship"]))
-                                    text_origin = translation["desc_on_ship"].replace(r"{{", "").replace(r"}}", "")
-                                    row[header_row.index("text3")] = text_origin
-                                    try:
-                                        row[header_row.index("text4")] = hi_lights
-                                    except ValueError:
-                                        pass
-                        writer.writerow(row)
-    except Exception as e:
+def _splice_table(table, csv_path, translates: dict) -> list[bytes] | None:
+    """
+    Translate a utf-8 csv in place of its changed cells, the rest keeps the bytes of the mod author.
+    :return: chunks of the translated csv, None when the csv has to be written again as a whole
+    """
+    encoding = parse.ModParser.detect_encoding(csv_path)
+    if encoding not in ("utf-8", "utf-8-sig"):
+        # translations are written as utf-8, the file is converted by the full rewrite
         return None
-    return new_path
+    with open(csv_path, "rb") as csv_file:
+        if os.fstat(csv_file.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(csv_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = len(codecs.BOM_UTF8) if encoding == "utf-8-sig" else 0
+            chunks = table.splice(data, translates, start)
+    if chunks is None:
+        logging.info("file(%s) has irregular quoting, written by csv.writer", csv_path)
+    return chunks
 
 
-def rewrite_mod_json(data_holder: DataHolder) -> str | None:
-    translation = data_holder.translates.get("MOD_META")
+def rewrite_mod_json(data_holder: DataHolder, new_path: str | None = None) -> str | None:
+    translation = data_holder.translates.get("MOD_META") or {}
     try:
-        new_path = data_holder.mod_path + r"/translate/mod_info.json_new"
+        new_path = new_path or os.path.join(data_holder.mod_path, "translate", "mod_info.json_new")
         info_json: dict = parse.ModParser.parse_metadata(data_holder.mod_path)[1]
-        if info_json.get("name"):
+        # untranslated fields keep the original text
+        if info_json.get("name") and translation.get("name"):
             info_json["name"] = translation.get("name")
-        if info_json.get("description"):
+        if info_json.get("description") and translation.get("description"):
             info_json["description"] = translation.get("description")
         with open(new_path, "w", encoding="utf8") as file:
             json.dump(info_json, file)
+            sync_file(file)
         return new_path
     except Exception:
         return None
 
 
+def apply_translation(data_holder: DataHolder, force: bool = False) -> list[str]:
+    """
+    Write data_holder.translates into the data files of its mod as one transaction.
+    Every translated file is written and fsynced next to its target as <file>_new first, then each
+    target is renamed to <file>_old and its new file renamed into place. Failures roll the renames
+    back, an apply cut short by a crash is rolled back by the next one (see recover_apply).
+    Targets still holding what the last apply wrote from the same translations are skipped,
+    see APPLY_MANIFEST.
+    :param force: rewrite every target
+    :return: paths of the skipped targets
+    :raise ValueError: a file could not be translated, the mod is left as it was
+    """
+    recover_apply(data_holder.mod_path)
+    translates = data_holder.translates
+    targets = [
+        (data_holder.description_csv_path, inject_descriptions_csv, DESCRIPTION_TABLE.used_translations),
+        (data_holder.weapon_csv_path, inject_weapon_csv, ENTITY_TABLES["WEAPON"].used_translations),
+        (data_holder.system_csv_path, inject_shipsystem_csv, ENTITY_TABLES["SHIP_SYSTEM"].used_translations),
+        (data_holder.hull_csv_path, inject_ship_hull_csv, ENTITY_TABLES["SHIP"].used_translations),
+        (data_holder.mod_info_path, rewrite_mod_json,
+         lambda translates: [(translates.get("MOD_META") or {}).get(key) for key in ("name", "description")]),
+    ]
+    manifest = {} if force else _load_manifest(data_holder.mod_path)
+    digests = {}
+    skipped = []
+    origin_paths = []
+    try:
+        for origin_path, write_translated, used_translations in targets:
+            if not os.path.isfile(origin_path):
+                raise ValueError("file(%s) not found" % origin_path)
+            key = os.path.relpath(origin_path, data_holder.mod_path)
+            digests[key] = _translation_digest(used_translations(translates))
+            entry = manifest.get(key)
+            if entry is not None and entry["translation"] == digests[key] \
+                    and _file_state(origin_path, entry["output"])["sha1"] == entry["output"]["sha1"]:
+                skipped.append(origin_path)
+                continue
+            origin_paths.append(origin_path)
+            if write_translated(data_holder, origin_path + "_new") is None:
+                raise ValueError("file(%s) translate failed" % origin_path)
+    except Exception:
+        for origin_path in origin_paths:
+            _remove(origin_path + "_new")
+        raise
+    if not origin_paths:
+        return skipped
+
+    # from here on recover_apply can undo whatever a crash leaves behind
+    make_translate_dir(data_holder.mod_path)
+    pending_path = _pending_path(data_holder.mod_path)
+    with open(pending_path, "w", encoding="utf-8") as pending_file:
+        json.dump(origin_paths, pending_file)
+        sync_file(pending_file)
+    try:
+        for origin_path in origin_paths:
+            os.replace(origin_path, origin_path + "_old")
+            os.replace(origin_path + "_new", origin_path)
+        sync_dirs(origin_paths)
+    except Exception:
+        _roll_back(origin_paths)
+        os.remove(pending_path)
+        raise
+    os.remove(pending_path)
+
+    for origin_path in origin_paths:
+        key = os.path.relpath(origin_path, data_holder.mod_path)
+        manifest[key] = {"translation": digests[key], "output": _file_state(origin_path)}
+    _save_manifest(data_holder.mod_path, manifest)
+    return skipped
+
+
+def recover_apply(mod_path) -> bool:
+    """
+    Roll back an apply_translation that was interrupted between its renames.
+    Call before reading the data files of a mod, they may be half translated until then.
+    :return: whether there was one to roll back
+    """
+    pending_path = _pending_path(mod_path)
+    try:
+        with open(pending_path, "r", encoding="utf-8") as pending_file:
+            origin_paths = json.load(pending_file)
+    except FileNotFoundError:
+        return False
+    except ValueError:
+        # crashed while writing the marker, no target was renamed yet
+        origin_paths = []
+    logging.warning("rolling back interrupted apply of mod(%s)", mod_path)
+    _roll_back(origin_paths)
+    os.remove(pending_path)
+    return True
+
+
+def _roll_back(origin_paths: list[str]):
+    for origin_path in origin_paths:
+        if os.path.exists(origin_path + "_new"):
+            # not renamed into place yet, the original is either untouched or already moved to _old
+            if not os.path.exists(origin_path):
+                os.replace(origin_path + "_old", origin_path)
+            _remove(origin_path + "_new")
+        elif os.path.exists(origin_path + "_old"):
+            os.replace(origin_path + "_old", origin_path)
+    sync_dirs(origin_paths)
+
+
+# translate/<APPLY_MANIFEST>: target relative to the mod -> digest of the translations it was written
+# from and state of the file written. Bump the version when inject output changes for equal input.
+APPLY_MANIFEST = "apply.manifest"
+APPLY_MANIFEST_VERSION = 1
+
+
+def _load_manifest(mod_path) -> dict:
+    try:
+        with open(os.path.join(mod_path, "translate", APPLY_MANIFEST), "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != APPLY_MANIFEST_VERSION:
+        return {}
+    return manifest.get("targets", {})
+
+
+def _save_manifest(mod_path, targets: dict):
+    manifest_path = os.path.join(mod_path, "translate", APPLY_MANIFEST)
+    try:
+        with open(manifest_path + "_new", "w", encoding="utf-8") as file:
+            json.dump({"version": APPLY_MANIFEST_VERSION, "targets": targets}, file)
+            sync_file(file)
+        os.replace(manifest_path + "_new", manifest_path)
+    except OSError as e:
+        # only costs a rewrite next time
+        logging.warning("apply manifest(%s) write failed: %s", manifest_path, e)
+
+
+def _translation_digest(used_translations) -> str:
+    # translate files keep their entry order, an equal dump means equal translations
+    if orjson is not None:
+        return hashlib.sha1(orjson.dumps(used_translations)).hexdigest()
+    text = json.dumps(used_translations, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _file_state(path, known: dict | None = None) -> dict:
+    """
+    :param known: state recorded before, its digest is reused while size and mtime still match
+    :return: {"size", "mtime_ns", "sha1"} of the file
+    """
+    stat = os.stat(path)
+    if known is not None and known.get("size") == stat.st_size and known.get("mtime_ns") == stat.st_mtime_ns:
+        return known
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": digest.hexdigest()}
+
+
+def _pending_path(mod_path) -> str:
+    return os.path.join(mod_path, "translate", "apply.pending")
+
+
+def sync_file(file):
+    file.flush()
+    os.fsync(file.fileno())
+
+
+def sync_dirs(paths: list[str]):
+    # persist the renames, directories can't be opened for fsync on Windows
+    for dir_path in {os.path.dirname(os.path.abspath(path)) for path in paths}:
+        try:
+            dir_fd = os.open(dir_path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.fsync(dir_fd)
+        except OSError:
+            pass
+        finally:
+            os.close(dir_fd)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
 def make_translate_dir(mod_path):
-    if not os.path.exists(mod_path + r"\translate\\"):
-        os.mkdir(mod_path + r"\\translate\\")
+    os.makedirs(os.path.join(mod_path, "translate"), exist_ok=True)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import threading
+
+import inject
+from prototypes import DataHolder
+
+
+class TranslationJournal:
+    """
+    Append-only journal of the translations saved in the editor, kept in the translate directory of the mod.
+    Every save appends one fsynced line [category, entity id, translation] to translates.journal.
+    Once the journal holds compact_after records it is sealed and folded into translates.snapshot,
+    a translate file, on a background thread. recover() replays snapshot, sealed and active journal in
+    that order, records set whole values so replaying one twice after a crash is harmless.
+    """
+    DEFAULT_COMPACT_AFTER = 1000
+
+    def __init__(self, mod_path: str, compact_after: int = DEFAULT_COMPACT_AFTER):
+        self.mod_path = mod_path
+        translate_dir = os.path.join(mod_path, "translate")
+        self.journal_path = os.path.join(translate_dir, "translates.journal")
+        self.sealed_path = self.journal_path + "_sealed"
+        self.snapshot_path = os.path.join(translate_dir, "translates.snapshot")
+        self.compact_after = compact_after
+        self.__file = None
+        self.__records = 0
+        self.__compaction: threading.Thread | None = None
+
+    def recover(self) -> dict:
+        """
+        Replay the journal and open it for record().
+        :return: the translates of the last session, every category of DataHolder.empty_translate present
+        """
+        self.close()
+        translates = {category: {} for category in DataHolder.empty_translate}
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as file:
+                translates.update(json.load(file))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning("translate snapshot(%s) unreadable: %s", self.snapshot_path, e)
+        TranslationJournal.__replay(self.sealed_path, translates)
+        valid_size, self.__records = TranslationJournal.__replay(self.journal_path, translates)
+
+        try:
+            inject.make_translate_dir(self.mod_path)
+            self.__file = open(self.journal_path, "ab")
+            # drop the torn tail of a crash, the next record would be glued to it
+            if self.__file.tell() > valid_size:
+                self.__file.truncate(valid_size)
+        except OSError as e:
+            logging.warning("translate journal(%s) open failed: %s", self.journal_path, e)
+            self.__file = None
+        return translates
+
+    def record(self, category: str, entity_id: str | None, translation: dict):
+        """
+        Append one save and wait until it is on disk.
+        :param entity_id: None sets the whole category, e.g. MOD_META
+        """
+        if self.__file is None:
+            return
+        line = json.dumps([category, entity_id, translation], ensure_ascii=False, separators=(",", ":")) + "\n"
+        try:
+            self.__file.write(line.encode("utf-8"))
+            inject.sync_file(self.__file)
+        except OSError as e:
+            logging.warning("translate journal(%s) write failed: %s", self.journal_path, e)
+            return
+        self.__records += 1
+        if self.__records >= self.compact_after:
+            self.compact()
+
+    def compact(self):
+        """
+        Seal the journal and fold it into the snapshot in the background, unless a compaction is running.
+        """
+        if self.__file is None or self.__compaction is not None and self.__compaction.is_alive():
+            return
+        # a sealed journal left by a crash is folded first, this one is sealed by the next compaction
+        if not os.path.exists(self.sealed_path):
+            try:
+                os.replace(self.journal_path, self.sealed_path)
+            except OSError as e:
+                logging.warning("translate journal(%s) seal failed: %s", self.journal_path, e)
+                return
+            # the old handle now writes into the sealed journal, switch only once a new one is open
+            try:
+                file = open(self.journal_path, "ab")
+            except OSError as e:
+                logging.warning("translate journal(%s) reopen failed: %s", self.journal_path, e)
+                # unseal, a fold would drop what the old handle writes after it
+                try:
+                    os.replace(self.sealed_path, self.journal_path)
+                except OSError as e:
+                    logging.warning("translate journal(%s) unseal failed: %s", self.sealed_path, e)
+                return
+            self.__file.close()
+            self.__file = file
+            self.__records = 0
+            inject.sync_dirs([self.sealed_path])
+        self.__compaction = threading.Thread(target=self.__fold_sealed, name="journal compaction", daemon=True)
+        self.__compaction.start()
+
+    def reset(self, translates: dict):
+        """
+        Replace everything journaled by translates, e.g. after importing a translate file.
+        """
+        self.__wait_compaction()
+        try:
+            self.__write_snapshot(translates)
+            if os.path.exists(self.sealed_path):
+                os.remove(self.sealed_path)
+            if self.__file is not None:
+                self.__file.truncate(0)
+                inject.sync_file(self.__file)
+                self.__records = 0
+        except OSError as e:
+            logging.warning("translate journal(%s) reset failed: %s", self.journal_path, e)
+
+    def close(self):
+        self.__wait_compaction()
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+    def __wait_compaction(self):
+        if self.__compaction is not None:
+            self.__compaction.join()
+            self.__compaction = None
+
+    def __fold_sealed(self):
+        translates = {}
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as file:
+                translates = json.load(file)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            # the sealed journal still holds everything saved since the last good snapshot
+            logging.warning("translate snapshot(%s) unreadable: %s", self.snapshot_path, e)
+            return
+        TranslationJournal.__replay(self.sealed_path, translates)
+        try:
+            self.__write_snapshot(translates)
+            os.remove(self.sealed_path)
+        except OSError as e:
+            logging.warning("translate snapshot(%s) write failed: %s", self.snapshot_path, e)
+
+    def __write_snapshot(self, translates: dict):
+        temp_path = self.snapshot_path + "_new"
+        inject.write_translates(temp_path, {category: group.items() for category, group in translates.items()})
+        with open(temp_path, "rb+") as file:
+            inject.sync_file(file)
+        os.replace(temp_path, self.snapshot_path)
+        inject.sync_dirs([self.snapshot_path])
+
+    @staticmethod
+    def __replay(journal_path: str, translates: dict) -> (int, int):
+        """
+        :return: size of the complete records at the start of the file, number of records
+        """
+        valid_size = 0
+        records = 0
+        try:
+            with open(journal_path, "rb") as file:
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        category, entity_id, translation = json.loads(line)
+                    except (ValueError, TypeError) as e:
+                        logging.warning("translate journal(%s) record skipped: %s", journal_path, e)
+                    else:
+                        if entity_id is None:
+                            translates[category] = translation
+                        else:
+                            translates.setdefault(category, {})[entity_id] = translation
+                    valid_size += len(line)
+                    records += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning("translate journal(%s) read failed: %s", journal_path, e)
+        return valid_size, records
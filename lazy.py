@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from parse import ModParser
+from table import DESCRIPTION_TABLE, ENTITY_TABLES
+
+
+class LazyEntities(MutableMapping):
+    """
+    id -> entity mapping of one entity csv that only holds the row index of the file.
+    Entities are read with one seek on first access and kept in a least-recently-used
+    cache of max_loaded entries, entities set explicitly are kept until removed.
+    Iterating items() or values() parses the whole file once instead of seeking row by row.
+    """
+    DEFAULT_MAX_LOADED = 256
+
+    def __init__(self, mod_path: str, kind: str, ids: dict, description_type: str | None = None,
+                 descriptions: dict | None = None, max_loaded: int = DEFAULT_MAX_LOADED):
+        """
+        :param kind: key of ENTITY_TABLES
+        :param ids: id -> row offset in file order, the rows of ModParser.row_index()
+        :param description_type: type of the rows of descriptions.csv attached to the entities
+        :param descriptions: that group of parse_descriptions() when already parsed,
+                             read row by row from descriptions.csv otherwise
+        """
+        self.mod_path = mod_path
+        self.kind = kind
+        self.description_type = description_type
+        self.descriptions = descriptions
+        self.max_loaded = max_loaded
+        self.__ids = ids
+        self.__ids_owned = False
+        self.__loaded: OrderedDict = OrderedDict()
+        self.__assigned: dict = {}
+
+    @staticmethod
+    def load(mod_path: str, kind: str, description_type: str | None = None, descriptions: dict | None = None):
+        """
+        :param description_type: descriptions.csv is indexed as well when given
+        :param descriptions: that group of parse_descriptions() when already parsed, descriptions.csv is not read
+        :return: LazyEntities of the csv of kind, a parsed dict when the csv can't be indexed
+        """
+        index = ModParser.row_index(ENTITY_TABLES[kind], mod_path)
+        if index is None:
+            return ModParser.parse_entities(mod_path, kind)
+        # indexed here on the loading thread, not by the first read of a description on the GUI thread
+        if description_type is not None and descriptions is None \
+                and ModParser.row_index(DESCRIPTION_TABLE, mod_path) is None:
+            # every read of an unindexed description would parse the whole file
+            descriptions = ModParser.parse_descriptions(mod_path).get(description_type) or {}
+        return LazyEntities(mod_path, kind, index["rows"], description_type, descriptions)
+
+    def __getitem__(self, entity_id):
+        entity = self.__assigned.get(entity_id)
+        if entity is not None:
+            return entity
+        entity = self.__loaded.get(entity_id)
+        if entity is not None:
+            self.__loaded.move_to_end(entity_id)
+            return entity
+        if entity_id not in self.__ids:
+            raise KeyError(entity_id)
+        entity = ModParser.read_entity(self.mod_path, self.kind, entity_id)
+        if entity is None:
+            # file changed under the mapping, the watcher replaces it
+            raise KeyError(entity_id)
+        self.__attach_description(entity_id, entity)
+        self.__loaded[entity_id] = entity
+        if len(self.__loaded) > self.max_loaded:
+            self.__loaded.popitem(last=False)
+        return entity
+
+    def __setitem__(self, entity_id, entity):
+        if entity_id not in self.__ids:
+            self.__own_ids()[entity_id] = None
+        self.__loaded.pop(entity_id, None)
+        self.__assigned[entity_id] = entity
+
+    def __delitem__(self, entity_id):
+        if entity_id not in self.__ids:
+            raise KeyError(entity_id)
+        del self.__own_ids()[entity_id]
+        self.__loaded.pop(entity_id, None)
+        self.__assigned.pop(entity_id, None)
+
+    def __contains__(self, entity_id):
+        return entity_id in self.__ids
+
+    def __iter__(self):
+        return iter(self.__ids)
+
+    def __len__(self):
+        return len(self.__ids)
+
+    def items(self):
+        entities = self.__parse_all()
+        for entity_id in self.__ids:
+            entity = self.__assigned.get(entity_id) or self.__loaded.get(entity_id) or entities.get(entity_id)
+            if entity is not None:
+                yield entity_id, entity
+
+    def values(self):
+        return (entity for _, entity in self.items())
+
+    def loaded_items(self) -> list[tuple[str, object]]:
+        """
+        :return: (id, entity) of every entity built or set so far, nothing is read
+        """
+        return list(self.__loaded.items()) + list(self.__assigned.items())
+
+    def __own_ids(self) -> dict:
+        # the row index is shared with ModParser, copy it before the first change
+        if not self.__ids_owned:
+            self.__ids = dict(self.__ids)
+            self.__ids_owned = True
+        return self.__ids
+
+    def __attach_description(self, entity_id, entity):
+        if self.description_type is None:
+            return
+        if self.descriptions is not None:
+            entity_desc = self.descriptions.get(entity_id)
+        else:
+            entity_desc = ModParser.read_description(self.mod_path, self.description_type, entity_id)
+        if entity_desc is not None:
+            for key, value in entity_desc.items():
+                entity.__setattr__(key, value)
+
+    def __parse_all(self) -> dict:
+        entities = ModParser.parse_entities(self.mod_path, self.kind)
+        if self.description_type is not None:
+            descriptions = self.descriptions
+            if descriptions is None:
+                descriptions = ModParser.parse_descriptions(self.mod_path).get(self.description_type)
+            ModParser.attach_descriptions(entities, descriptions)
+        return entities
@@ -0,0 +1,115 @@
+import logging
+
+from lazy import LazyEntities
+from parse import ModParser
+from prototypes import DataHolder
+from table import ParseCancelled, cancellable
+
+
+def _parse_metadata(mod_path):
+    try:
+        return ModParser.parse_metadata(mod_path)[0]
+    except ValueError:
+        logging.warning("mod_info.json of (%s) parse failed", mod_path)
+        return None
+
+
+class ModLoader:
+    """
+    Parses the data files of a mod into one DataHolder, one file after another on the calling thread.
+    Entity tables are parsed without waiting for descriptions.csv, only the merge of
+    their description texts depends on it (see DEPENDS_ON).
+    """
+    # DataHolder attribute -> parse task
+    TASKS = {
+        "descriptions": (ModParser.parse_descriptions,),
+        "weapons": (ModParser.parse_weapons, None),
+        "ship_hulls": (ModParser.parse_hulls, None),
+        "ship_systems": (ModParser.parse_ship_systems, None),
+        "hullmods": (ModParser.parse_hullmods,),
+        "metadata": (_parse_metadata,),
+    }
+    # DataHolder attribute -> description group merged into it once both are parsed
+    DEPENDS_ON = {
+        "weapons": "WEAPON",
+        "ship_hulls": "SHIP",
+        "ship_systems": "SHIP_SYSTEM",
+    }
+    # DataHolder attribute -> task building a LazyEntities instead of parsing the csv
+    LAZY_TASKS = {
+        "weapons": (LazyEntities.load, "WEAPON", "WEAPON"),
+        "ship_hulls": (LazyEntities.load, "SHIP", "SHIP"),
+        "ship_systems": (LazyEntities.load, "SHIP_SYSTEM", "SHIP_SYSTEM"),
+        "hullmods": (LazyEntities.load, "HULLMOD"),
+    }
+
+    def __init__(self, lazy: bool = False):
+        """
+        :param lazy: load entity tables as LazyEntities, only their row index is read up front
+                     and descriptions.csv is not parsed for them
+        """
+        self.lazy = lazy
+
+    def __task(self, part: str, descriptions: dict | None) -> tuple:
+        task = self.LAZY_TASKS.get(part) if self.lazy else None
+        if task is None:
+            return self.TASKS[part]
+        if descriptions is not None and part in self.DEPENDS_ON:
+            task += (descriptions.get(self.DEPENDS_ON[part], {}),)
+        return task
+
+    def load(self, mod_path: str, data_holder: DataHolder | None = None, parts=None) -> DataHolder:
+        """
+        :param mod_path:
+        :param data_holder: filled in place, a new one is created when None
+        :param parts: DataHolder attributes to (re)load, all of TASKS by default
+        :return: data_holder
+        """
+        if data_holder is None:
+            data_holder = DataHolder(mod_path=mod_path)
+        parts = list(self.TASKS.keys()) if parts is None else parts
+        results = self.parse(mod_path, parts, data_holder.descriptions)
+        for part, result in results.items():
+            data_holder.__setattr__(part, result)
+        return data_holder
+
+    def parse(self, mod_path: str, parts, descriptions: dict | None = None,
+              progress=None, is_cancelled=None) -> dict | None:
+        """
+        Parse without touching any DataHolder, safe to run off the GUI thread.
+        :param parts: DataHolder attributes to parse
+        :param descriptions: already parsed descriptions, parsed again when None and a part needs them
+        :param progress: called with (part, parts done, parts total) whenever a part finishes
+        :param is_cancelled: polled every CANCEL_CHECK_ROWS rows of a file
+        :return: DataHolder attribute -> parsed value, None when cancelled
+        """
+        parts = list(parts)
+        if descriptions is None and "descriptions" not in parts and not self.lazy \
+                and any(part in self.DEPENDS_ON for part in parts):
+            parts.append("descriptions")
+
+        results = {}
+        try:
+            with cancellable(is_cancelled):
+                for part in parts:
+                    task = self.__task(part, descriptions)
+                    results[part] = task[0](mod_path, *task[1:])
+                    if progress is not None:
+                        progress(part, len(results), len(parts))
+        except ParseCancelled:
+            return None
+
+        descriptions = results.get("descriptions", descriptions)
+        for part, group in self.DEPENDS_ON.items():
+            if part not in results:
+                continue
+            if isinstance(results[part], LazyEntities):
+                # attached as entities are read, from descriptions.csv itself when not parsed
+                if descriptions is not None:
+                    results[part].descriptions = descriptions.get(group, {})
+            else:
+                if descriptions is None:
+                    # a lazy load of a csv that couldn't be indexed
+                    descriptions = ModParser.parse_descriptions(mod_path)
+                ModParser.attach_descriptions(results[part], descriptions.get(group))
+        return results
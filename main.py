@@ -1,14 +1,16 @@
-import json
 import logging.config
 import os
-import shutil
 import sys
 
-import json5
 from PyQt5.QtWidgets import QAction, QFileDialog
 
 import inject
 import parse
+from cache import ParseCache
+from journal import TranslationJournal
+from loader import ModLoader
+from store import STORE_SUFFIX, TranslationStore
+from workers import ModFileWatcher
 from pages import *
 from prototypes import DataHolder
 
@@ -29,6 +31,10 @@ class AppMainWindow(QMainWindow):
         self.data_holder.ship_skins = None
 
         self.data_holder.translates = {}
+        # saved translations of the loaded mod, recovered when it is loaded again
+        self.journal: TranslationJournal | None = None
+        # imported translation store, saves are written to it instead of the journal
+        self.store: TranslationStore | None = None
 
         if getattr(sys, "frozen", False):
             path = os.path.dirname(sys.executable)
@@ -36,8 +42,19 @@ class AppMainWindow(QMainWindow):
             path = os.path.dirname(__file__)
 
         self.io_path = path
+        ModParser.cache = ParseCache(ParseCache.default_dir())
 
         self.ui_str = parse.parse_ui_str(os.path.join(path, "lang.ini"))
+
+        # one page per editor kept alive, rebuilt only when mod or translations change
+        self.page_stack = QStackedWidget(self)
+        self.setCentralWidget(self.page_stack)
+        self.__pages: dict[type, QWidget] = {}
+        self.__stale_pages: set[type] = set()
+        # re-parses single files of the mod when they change on disk
+        self.file_watcher = ModFileWatcher(self.data_holder, self)
+        self.file_watcher.entities_changed.connect(self.__entities_changed)
+
         self._init_gui(self.ui_str)
 
     def _init_gui(self, ui_str: dict):
@@ -100,110 +117,103 @@ class AppMainWindow(QMainWindow):
         self.__turn_to_page(ModMetaPage, self.data_holder)
 
     def _edit_hulls(self):
-        # not jump on its own
-        if type(self.centralWidget()) == ShipHullListPage:
-            return
-        try:
-            if getattr(self.centralWidget(), "translate_block", None).is_edited:
-                reply = QMessageBox.question(self, "", self.ui_str["msg_unsaved_exit"],
-                                             QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-                if reply == QMessageBox.No:
-                    return
-            self.__turn_to_page(ShipHullListPage, self.data_holder)
-        except AttributeError:
-            # doesn't have module that requires saving
-            self.__turn_to_page(ShipHullListPage, self.data_holder)
+        self.__switch_page(ShipHullListPage)
 
     def _edit_mod_meta(self):
-        # not jump on its own
-        if type(self.centralWidget()) == ModMetaPage:
-            return
-        try:
-            if getattr(self.centralWidget(), "translate_block", None).is_edited:
-                reply = QMessageBox().question(self, "", self.ui_str["msg_unsaved_exit"],
-                                               QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-                if reply == QMessageBox.No:
-                    return
-            self.__turn_to_page(ModMetaPage, self.data_holder)
-        except AttributeError:
-            # doesn't have module that requires saving
-            self.__turn_to_page(ModMetaPage, self.data_holder)
+        self.__switch_page(ModMetaPage)
 
     def _edit_weapons(self):
-        # not jump on its own
-        if type(self.centralWidget()) == WeaponListPage:
-            return
-        try:
-            if getattr(self.centralWidget(), "translate_block").is_edited:
-                reply = QMessageBox.question(self, "", self.ui_str["msg_unsaved_exit"],
-                                             QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-                if reply == QMessageBox.No:
-                    return
-            self.__turn_to_page(WeaponListPage, self.data_holder)
-        except AttributeError:
-            # doesn't have module that requires saving
-            self.__turn_to_page(WeaponListPage, self.data_holder)
+        self.__switch_page(WeaponListPage)
 
     def _edit_systems(self):
-        # not jump on its own
-        if type(self.centralWidget()) == ShipSystemListPage:
-            return
-        try:
-            if getattr(self.centralWidget(), "translate_block").is_edited:
-                reply = QMessageBox.question(self, "", self.ui_str["msg_unsaved_exit"],
-                                             QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-                if reply == QMessageBox.No:
-                    return
-            self.__turn_to_page(ShipSystemListPage, self.data_holder)
-        except AttributeError:
-            # doesn't have module that requires saving
-            self.__turn_to_page(ShipSystemListPage, self.data_holder)
+        self.__switch_page(ShipSystemListPage)
 
     def _edit_hullmods(self):
+        self.__switch_page(HullModListPage)
+
+    def __switch_page(self, target_class: type):
+        current = self.page_stack.currentWidget()
         # not jump on its own
-        if type(self.centralWidget()) == HullModListPage:
+        if type(current) == target_class:
             return
-        try:
-            if getattr(self.centralWidget(), "translate_block").is_edited:
-                reply = QMessageBox().question(self, "", self.ui_str["msg_unsaved_exit"],
-                                               QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-                if reply == QMessageBox.No:
-                    return
-            self.__turn_to_page(HullModListPage, self.data_holder)
-        except AttributeError:
-            # doesn't have module that requires saving
-            self.__turn_to_page(HullModListPage, self.data_holder)
+        translate_block = getattr(current, "translate_block", None)
+        if translate_block is not None and translate_block.is_edited:
+            reply = QMessageBox.question(self, "", self.ui_str["msg_unsaved_exit"],
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if reply == QMessageBox.No:
+                return
+            # abandoned edits are dropped once the page is shown again
+            self.__stale_pages.add(type(current))
+        self.__turn_to_page(target_class, self.data_holder)
 
     def __turn_to_page(self, target_class: type, data_holder: DataHolder):
-        self.setCentralWidget(target_class(self, self.ui_str, data_holder))
+        page = self.__pages.get(target_class)
+        if page is None:
+            page = target_class(self, self.ui_str, data_holder)
+            self.__pages[target_class] = page
+            self.page_stack.addWidget(page)
+        elif target_class in self.__stale_pages:
+            page.update()
+        self.__stale_pages.discard(target_class)
+        self.page_stack.setCurrentWidget(page)
+
+    def __invalidate_pages(self):
+        """
+        Mod or translations changed: refresh the visible page now, the others once they are shown.
+        """
+        current = self.page_stack.currentWidget()
+        for page_class, page in self.__pages.items():
+            if page is current:
+                page.update()
+            else:
+                self.__stale_pages.add(page_class)
+
+    def __entities_changed(self, part: str, changed: set, ids_changed: bool):
+        for page in self.__pages.values():
+            page.entities_changed(part, changed, ids_changed)
 
     def import_translates(self):
         translate_url = QFileDialog.getOpenFileName(self,
                                                     self.ui_str["wt_import_translate_file"],
                                                     self.io_path,
-                                                    "*.translate")
+                                                    "*.translate *" + STORE_SUFFIX)
         if translate_url[0]:
             self.io_path = os.path.dirname(translate_url[0])
-            with open(translate_url[0], "r", encoding="utf-8") as file:
-                translates = json5.load(file)
-                self.data_holder.translates = translates
+            self.__close_store()
+            if translate_url[0].endswith(STORE_SUFFIX):
+                # read category by category as the pages need them, every save is a committed row
+                self.store = TranslationStore(translate_url[0])
+                self.data_holder.translates = self.store.translates()
+                self.data_holder.journal = None
+            else:
+                with open(translate_url[0], "r", encoding="utf-8") as file:
+                    translates = ModParser.loads_json(file.read(), translate_url[0])
+                    self.data_holder.translates = translates
+                if self.journal is not None:
+                    self.journal.reset(translates)
+                self.data_holder.journal = self.journal
             QMessageBox().information(self, self.ui_str["wt_msg_success"], self.ui_str["msg_import_success"],
                                       QMessageBox.Close, QMessageBox.Close)
-            if self.centralWidget() is not None:
-                self.centralWidget().update()
+            self.__invalidate_pages()
 
     def export_translates(self):
         file_path = QFileDialog.getSaveFileName(self,
                                                 self.ui_str["wt_export_translate_file"],
                                                 self.io_path + "/" + self.ui_str[
                                                     "default_savefile_name"] + ".translate",
-                                                "*.translate")
+                                                "*.translate;;*" + STORE_SUFFIX)
         if len(file_path[0]) == 0:
             # abort
             return
+        elif file_path[0].endswith(STORE_SUFFIX):
+            # the opened store already holds every save
+            if self.store is None or os.path.abspath(file_path[0]) != os.path.abspath(self.store.file_path):
+                store = TranslationStore(file_path[0], create=True)
+                store.replace_all(self.data_holder.translates)
+                store.close()
         else:
-            with open(file_path[0], "w", encoding="utf-8") as save_file:
-                save_file.write(json.dumps(self.data_holder.translates))
+            inject.write_translates(file_path[0], {category: group.items()
+                                                   for category, group in self.data_holder.translates.items()})
 
     def export_original(self):
         file_path = QFileDialog.getSaveFileName(self,
@@ -212,19 +222,11 @@ class AppMainWindow(QMainWindow):
                                                     "default_savefile_name"] + ".translate",
                                                 "*.translate")
         if file_path[0]:
-            mod_path = self.data_holder.mod_path
-            # load all data
-            if not self.data_holder.descriptions:
-                desc = ModParser.parse_descriptions(mod_path)
-                self.data_holder.descriptions = desc
-            else:
-                desc = self.data_holder.descriptions
-            if not self.data_holder.weapons:
-                self.data_holder.weapons = ModParser.parse_weapons(mod_path, desc["WEAPON"])
-            if not self.data_holder.ship_hulls:
-                self.data_holder.ship_hulls = ModParser.parse_hulls(mod_path, desc["SHIP"])
-            if not self.data_holder.ship_systems:
-                self.data_holder.ship_systems = ModParser.parse_ship_systems(mod_path, desc["SHIP_SYSTEM"])
+            # load all missing data at once
+            missing = [part for part in ("descriptions", "weapons", "ship_hulls", "ship_systems")
+                       if not self.data_holder.__getattribute__(part)]
+            if missing:
+                ModLoader().load(self.data_holder.mod_path, self.data_holder, parts=missing)
             # write file
             inject.export_data_as_translate(file_path[0], self.data_holder)
             QMessageBox().information(self, self.ui_str["wt_msg_success"], self.ui_str["msg_save_success"],
@@ -237,40 +239,52 @@ class AppMainWindow(QMainWindow):
                                                         )
         if get_mod_path:
             self.io_path = os.path.realpath(get_mod_path + r"/..")
+            try:
+                # the files of an apply cut short by a crash are half translated
+                if inject.recover_apply(get_mod_path):
+                    QMessageBox().information(self, self.ui_str["wt_msg_success"],
+                                              self.ui_str["msg_apply_recovered"],
+                                              QMessageBox.Close, QMessageBox.Close)
+            except OSError:
+                logging.exception("rolling back interrupted apply of mod(%s) failed", get_mod_path)
+                QMessageBox().critical(self, self.ui_str["wt_msg_fail"], self.ui_str["msg_apply_recover_fail"],
+                                       QMessageBox.Close, QMessageBox.Close)
             self.data_holder.clear()
             self.data_holder.mod_path = get_mod_path
-            if self.centralWidget() is not None:
-                self.centralWidget().update()
+            self.__open_journal()
+            self.file_watcher.watch()
+            self.__invalidate_pages()
+
+    def __open_journal(self):
+        self.__close_store()
+        if self.journal is not None:
+            self.journal.close()
+        self.journal = TranslationJournal(self.data_holder.mod_path)
+        self.data_holder.translates = self.journal.recover()
+        self.data_holder.journal = self.journal
+
+    def __close_store(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def closeEvent(self, event):
+        self.__close_store()
+        if self.journal is not None:
+            self.journal.close()
+        super().closeEvent(event)
 
     def apply_translation(self):
-        shutil.copy(self.data_holder.description_csv_path, self.data_holder.description_csv_path + "_old")
-        shutil.copy(self.data_holder.weapon_csv_path, self.data_holder.weapon_csv_path + "_old")
-        shutil.copy(self.data_holder.system_csv_path, self.data_holder.system_csv_path + "_old")
-        shutil.copy(self.data_holder.hull_csv_path, self.data_holder.hull_csv_path + "_old")
-        shutil.copy(self.data_holder.mod_info_path, self.data_holder.mod_info_path + "_old")
         try:
-            temp = inject.inject_descriptions_csv(self.data_holder)
-            shutil.copy(temp, self.data_holder.description_csv_path)
-
-            temp = inject.inject_weapon_csv(self.data_holder)
-            shutil.copy(temp, self.data_holder.weapon_csv_path)
-
-            temp = inject.inject_shipsystem_csv(self.data_holder)
-            shutil.copy(temp, self.data_holder.system_csv_path)
-
-            temp = inject.inject_ship_hull_csv(self.data_holder)
-            shutil.copy(temp, self.data_holder.hull_csv_path)
-
-            temp = inject.rewrite_mod_json(self.data_holder)
-            shutil.copy(temp, self.data_holder.mod_info_path)
-
-            QMessageBox().information(self, self.ui_str["wt_msg_success"], self.ui_str["msg_apply_success"],
+            skipped = inject.apply_translation(self.data_holder)
+            message = self.ui_str["msg_apply_success"]
+            if skipped:
+                file_names = ", ".join(os.path.basename(path) for path in skipped)
+                message += "\n" + self.ui_str["msg_apply_skipped"].format(file_names=file_names)
+            QMessageBox().information(self, self.ui_str["wt_msg_success"], message,
                                       QMessageBox.Close, QMessageBox.Close)
         except Exception:
-            shutil.copy(self.data_holder.description_csv_path + "_old", self.data_holder.description_csv_path)
-            shutil.copy(self.data_holder.weapon_csv_path + "_old", self.data_holder.weapon_csv_path)
-            shutil.copy(self.data_holder.system_csv_path + "_old", self.data_holder.system_csv_path)
-            shutil.copy(self.data_holder.hull_csv_path + "_old", self.data_holder.hull_csv_path)
+            logging.exception("applying translation to mod(%s) failed", self.data_holder.mod_path)
             QMessageBox().critical(self, self.ui_str["wt_msg_fail"], self.ui_str["msg_apply_fail"],
                                    QMessageBox.Close, QMessageBox.Close)
 
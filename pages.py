@@ -1,8 +1,177 @@
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThreadPool, QAbstractListModel, QModelIndex, QSortFilterProxyModel, pyqtSignal
 from PyQt5.QtWidgets import *
 
 import prototypes
 from parse import ModParser
+from workers import LoadWorker
+
+
+class EntityListModel(QAbstractListModel):
+    """
+    Read-only model over a list of entity ids, with an id -> row index.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.__ids: list[str] = []
+        self.__rows: dict[str, int] = {}
+
+    def set_ids(self, ids: list[str]):
+        self.beginResetModel()
+        self.__ids = ids
+        self.__rows = {entity_id: row for row, entity_id in enumerate(ids)}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.__ids)
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.__ids[index.row()]
+        return None
+
+    def id_at(self, row: int) -> str:
+        return self.__ids[row]
+
+    def row_of(self, entity_id: str) -> int:
+        return self.__rows.get(entity_id, -1)
+
+
+class EntityList(QWidget):
+    """
+    Filterable list of entity ids, only the visible rows are ever rendered.
+    """
+    id_clicked = pyqtSignal(str)
+
+    def __init__(self, ui_str: dict, parent=None):
+        super().__init__(parent=parent)
+        self.model = EntityListModel(self)
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.model)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText(ui_str["hint_filter"])
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_edit.textChanged.connect(self.proxy.setFilterFixedString)
+
+        self.view = QListView()
+        self.view.setModel(self.proxy)
+        self.view.setUniformItemSizes(True)
+        self.view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.view.clicked.connect(lambda index: self.id_clicked.emit(index.data()))
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.filter_edit)
+        layout.addWidget(self.view, stretch=1)
+        self.setLayout(layout)
+
+    def __len__(self) -> int:
+        return self.model.rowCount()
+
+    def set_ids(self, ids: list[str]):
+        self.model.set_ids(ids)
+
+    def select(self, entity_id: str):
+        row = self.model.row_of(entity_id)
+        if row >= 0:
+            self.view.setCurrentIndex(self.proxy.mapFromSource(self.model.index(row)))
+
+    def neighbour(self, entity_id: str, step: int) -> str | None:
+        """
+        :param step: -1 for the previous id, 1 for the next one
+        :return: id next to entity_id in the filtered list, None at either end
+        """
+        row = self.model.row_of(entity_id)
+        if row < 0:
+            return None
+        proxy_row = self.proxy.mapFromSource(self.model.index(row)).row()
+        if proxy_row < 0:
+            # filtered out, walk the full list instead
+            row += step
+            return self.model.id_at(row) if 0 <= row < self.model.rowCount() else None
+        proxy_row += step
+        if 0 <= proxy_row < self.proxy.rowCount():
+            return self.proxy.index(proxy_row, 0).data()
+        return None
+
+
+class BackgroundLoading:
+    """
+    Background parsing shared by the list pages.
+    The page shows a progress bar while a LoadWorker parses, results are stored into the
+    DataHolder on the GUI thread and announced through data_ready().
+    """
+
+    def _setup_progress_bar(self) -> QProgressBar:
+        self._load_worker = None
+        # one connection for the page's lifetime, whichever worker is running then is cancelled
+        self.destroyed.connect(lambda: self._cancel_loading())
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setFormat(self.ui_str["msg_loading"] + " %p%")
+        self.progress_bar.setVisible(False)
+        return self.progress_bar
+
+    def _load_in_background(self, parts: list[str], force_update: bool):
+        self._cancel_loading()
+        # descriptions are parsed again along with the parts when forced
+        descriptions = None if force_update else self.data_holder.descriptions
+        worker = LoadWorker(self.data_holder.mod_path, parts, descriptions)
+        worker.setAutoDelete(False)
+        generation = self.data_holder.generation
+        worker.signals.progress.connect(self._load_progress)
+        worker.signals.finished.connect(lambda result: self._load_finished(worker, generation, result))
+        worker.signals.failed.connect(lambda message: self._load_failed(worker))
+        self._load_worker = worker
+
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setVisible(True)
+        self.right_panel.setEnabled(False)
+        QThreadPool.globalInstance().start(worker)
+
+    def _cancel_loading(self):
+        worker = self._load_worker
+        if worker is not None:
+            worker.cancel()
+            QThreadPool.globalInstance().tryTake(worker)
+            self._load_worker = None
+
+    def _load_progress(self, part: str, done: int, total: int):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+
+    def _load_finished(self, worker: LoadWorker, generation: int, result: dict):
+        # superseded by a newer load, or the mod was switched meanwhile
+        if worker is not self._load_worker or worker.is_cancelled:
+            return
+        self._load_worker = None
+        self.progress_bar.setVisible(False)
+        self.right_panel.setEnabled(True)
+        if generation != self.data_holder.generation or worker.mod_path != self.data_holder.mod_path:
+            return
+        for part, value in result.items():
+            self.data_holder.__setattr__(part, value)
+        self.data_ready()
+
+    def _load_failed(self, worker: LoadWorker):
+        if worker is not self._load_worker:
+            return
+        self._load_worker = None
+        self.progress_bar.setVisible(False)
+        QMessageBox().warning(self, "", self.ui_str["msg_file_parse_failed"], QMessageBox.Close, QMessageBox.Close)
+
+    def data_ready(self):
+        pass
+
+    def entities_changed(self, part: str, changed: set, ids_changed: bool):
+        """
+        Some loaded entities were parsed again after their file changed on disk.
+        :param part: DataHolder attribute that was patched
+        :param changed: ids added or changed
+        :param ids_changed: ids were added, removed or reordered
+        """
+        pass
 
 
 class ModMetaPage(QWidget):
@@ -126,7 +295,7 @@ class ModMetaPage(QWidget):
             translate = {"id": self.data_holder.metadata.id,
                          "name": self.name_edit.text(),
                          "description": self.desc_edit.toPlainText()}
-            self.data_holder.translates["MOD_META"] = translate
+            self.data_holder.set_translation("MOD_META", None, translate)
             self.translate_data = translate
             QMessageBox().information(self, "", self.ui_str["msg_save_success"], QMessageBox.Close, QMessageBox.Close)
             self.is_edited = False
@@ -138,40 +307,56 @@ class ModMetaPage(QWidget):
         self.get_data(force_update=True)
         self.update_ui()
 
+    def entities_changed(self, part: str, changed: set, ids_changed: bool):
+        if part == "metadata" and not self.is_edited:
+            self.update_ui()
+
 
-class ShipHullListPage(QWidget):
+class ShipHullListPage(QWidget, BackgroundLoading):
     def __init__(self, parent, ui_str: dict, data_holder: prototypes.DataHolder):
         super().__init__(parent=parent)
         self.ui_str = ui_str
         self.data_holder = data_holder
         self.hull_id_list = []
 
-        self.get_data()
-
         self._setup_ui()
 
-        self.update_ui()
+        self.get_data()
 
     def update(self) -> None:
-        self.get_data(force_update=True)
-        self.update_ui()
+        self.get_data()
 
     def get_data(self, force_update: bool = False):
-        if self.data_holder.descriptions is None or force_update:
-            self.data_holder.descriptions = ModParser.parse_descriptions(self.data_holder.mod_path)
         if self.data_holder.ship_hulls is None or force_update:
-            self.data_holder.ship_hulls = ModParser.parse_hulls(self.data_holder.mod_path,
-                                                                self.data_holder.descriptions.get("SHIP"))
+            self._load_in_background(["ship_hulls"], force_update)
+        else:
+            self.data_ready()
+
+    def data_ready(self):
         self.hull_id_list = list(self.data_holder.ship_hulls.keys())
+        self.update_ui()
+
+    def entities_changed(self, part: str, changed: set, ids_changed: bool):
+        if part != "ship_hulls" or self.translate_block.hull is None:
+            return
+        now_id = self.translate_block.hull.id
+        if ids_changed:
+            self.hull_id_list = list(self.data_holder.ship_hulls.keys())
+            self.hull_list.set_ids(self.hull_id_list)
+        if now_id not in self.data_holder.ship_hulls:
+            self.update_ui()
+            return
+        self.hull_list.select(now_id)
+        if now_id in changed and not self.translate_block.is_edited:
+            self.translate_block.load_data(self.data_holder.ship_hulls[now_id],
+                                           self.data_holder.translates["SHIP"].get(now_id))
 
     def _setup_ui(self):
         main_layout = QHBoxLayout()
         splitter = QSplitter(self)
         # left_panel
-        self.hull_list = QListWidget()
-        self.hull_list.itemClicked.connect(self._hull_list_clicked)
-        for hull_id in self.data_holder.ship_hulls.keys():
-            self.hull_list.addItem(hull_id)
+        self.hull_list = EntityList(self.ui_str)
+        self.hull_list.id_clicked.connect(self._hull_list_clicked)
         # right_main
         self.translate_block = ShipHullTranslateBlock(self, self.ui_str, data_holder=self.data_holder)
         # right_under
@@ -192,7 +377,7 @@ class ShipHullListPage(QWidget):
         temp_layout.addSpacing(1)
         temp_layout.addWidget(self.next_button)
 
-        right_panel = QFrame()
+        self.right_panel = QFrame()
         right_panel_layout = QVBoxLayout()
 
         right_scroll = QScrollArea(self)
@@ -202,54 +387,54 @@ class ShipHullListPage(QWidget):
         right_scroll.setWidget(self.translate_block)
         right_panel_layout.addWidget(right_scroll, stretch=1)
         right_panel_layout.addLayout(temp_layout)
-        right_panel.setLayout(right_panel_layout)
+        self.right_panel.setLayout(right_panel_layout)
+
+        left_panel = QWidget()
+        left_panel_layout = QVBoxLayout()
+        left_panel_layout.setContentsMargins(0, 0, 0, 0)
+        left_panel_layout.addWidget(self._setup_progress_bar())
+        left_panel_layout.addWidget(self.hull_list, stretch=1)
+        left_panel.setLayout(left_panel_layout)
 
-        splitter.addWidget(self.hull_list)
-        splitter.addWidget(right_panel)
+        splitter.addWidget(left_panel)
+        splitter.addWidget(self.right_panel)
         main_layout.addWidget(splitter)
 
         self.setLayout(main_layout)
 
     def update_ui(self):
-        self.hull_list.clear()
-        for hull_id in self.data_holder.ship_hulls.keys():
-            self.hull_list.addItem(hull_id)
+        self.hull_list.set_ids(self.hull_id_list)
         if len(self.hull_id_list) > 0:
             self.translate_block.load_data(self.data_holder.ship_hulls[self.hull_id_list[0]],
                                            self.data_holder.translates["SHIP"].get(self.hull_id_list[0]))
 
-    def _hull_list_clicked(self, item):
-        hull_id = item.text()
+    def _hull_list_clicked(self, hull_id: str):
         if hull_id != self.translate_block.hull.id:
             if self.__check_jump_without_saving():
                 self.translate_block.load_data(self.data_holder.ship_hulls[hull_id],
                                                self.data_holder.translates["SHIP"].get(hull_id))
 
     def _prev_clicked(self):
-        now_id = self.translate_block.hull.id
-        now_index = self.hull_id_list.index(now_id)
+        prev_id = self.hull_list.neighbour(self.translate_block.hull.id, -1)
         # already top
-        if now_index == 0:
+        if prev_id is None:
             QMessageBox.question(self, "", self.ui_str["msg_first_in_list"],
                                  QMessageBox.Close, QMessageBox.Close)
         else:
             if self.__check_jump_without_saving():
-                prev_id = self.hull_id_list[now_index - 1]
-                self.hull_list.setCurrentRow(now_index - 1)
+                self.hull_list.select(prev_id)
                 self.translate_block.load_data(self.data_holder.ship_hulls[prev_id],
                                                self.data_holder.translates["SHIP"].get(prev_id))
 
     def _next_clicked(self):
-        now_id = self.translate_block.hull.id
-        now_index = self.hull_id_list.index(now_id)
+        next_id = self.hull_list.neighbour(self.translate_block.hull.id, 1)
         # already bottom
-        if now_index >= len(self.hull_id_list) - 1:
+        if next_id is None:
             QMessageBox.question(self, "", self.ui_str["msg_last_in_list"],
                                  QMessageBox.Close, QMessageBox.Close)
         else:
             if self.__check_jump_without_saving():
-                next_id = self.hull_id_list[now_index + 1]
-                self.hull_list.setCurrentRow(now_index + 1)
+                self.hull_list.select(next_id)
                 self.translate_block.load_data(self.data_holder.ship_hulls[next_id],
                                                self.data_holder.translates["SHIP"].get(next_id))
 
@@ -361,44 +546,55 @@ class ShipHullTranslateBlock(QWidget):
                     self.translate_data[key] = edit.text()
                 elif isinstance(edit, QTextEdit):
                     self.translate_data[key] = edit.toPlainText()
-            self.data_holder.translates["SHIP"][self.hull.id] = self.translate_data
+            self.data_holder.set_translation("SHIP", self.hull.id, self.translate_data)
             QMessageBox.question(self, "", self.ui["msg_save_success"], QMessageBox.Close, QMessageBox.Close)
             self.is_edited = False
             return True
         return False
 
 
-class WeaponListPage(QWidget):
+class WeaponListPage(QWidget, BackgroundLoading):
     def __init__(self, parent, ui_str: dict, data_holder: prototypes.DataHolder):
         super().__init__(parent=parent)
         self.ui_str = ui_str
         self.data_holder = data_holder
         self.weapon_id_list = []
 
-        self.get_data()
-
         self._setup_ui()
 
-        if len(self.weapon_id_list) > 0:
-            self.translate_block.load_data(self.data_holder.weapons[self.weapon_id_list[0]],
-                                           self.data_holder.translates.get(self.weapon_id_list[0]))
+        self.get_data()
 
     def get_data(self, force_update: bool = False):
-        if self.data_holder.descriptions is None or force_update:
-            self.data_holder.descriptions = ModParser.parse_descriptions(self.data_holder.mod_path)
         if self.data_holder.weapons is None or force_update:
-            self.data_holder.weapons = ModParser.parse_weapons(self.data_holder.mod_path,
-                                                               self.data_holder.descriptions.get("WEAPON"))
+            self._load_in_background(["weapons"], force_update)
+        else:
+            self.data_ready()
+
+    def data_ready(self):
         self.weapon_id_list = list(self.data_holder.weapons.keys())
+        self.update_ui()
+
+    def entities_changed(self, part: str, changed: set, ids_changed: bool):
+        if part != "weapons" or self.translate_block.weapon is None:
+            return
+        now_id = self.translate_block.weapon.id
+        if ids_changed:
+            self.weapon_id_list = list(self.data_holder.weapons.keys())
+            self.weapon_list.set_ids(self.weapon_id_list)
+        if now_id not in self.data_holder.weapons:
+            self.update_ui()
+            return
+        self.weapon_list.select(now_id)
+        if now_id in changed and not self.translate_block.is_edited:
+            self.translate_block.load_data(self.data_holder.weapons[now_id],
+                                           self.data_holder.translates["WEAPON"].get(now_id))
 
     def _setup_ui(self):
         main_layout = QHBoxLayout()
         splitter = QSplitter(self)
         # left_panel
-        self.weapon_list = QListWidget()
-        self.weapon_list.itemClicked.connect(self._list_clicked)
-        for weapon_id in self.data_holder.weapons.keys():
-            self.weapon_list.addItem(weapon_id)
+        self.weapon_list = EntityList(self.ui_str)
+        self.weapon_list.id_clicked.connect(self._list_clicked)
         # right_main
         self.translate_block = WeaponTranslateBlock(self, self.ui_str, data_holder=self.data_holder)
         # right_under
@@ -419,7 +615,7 @@ class WeaponListPage(QWidget):
         temp_layout.addSpacing(1)
         temp_layout.addWidget(self.next_button)
 
-        right_panel = QFrame()
+        self.right_panel = QFrame()
         right_panel_layout = QVBoxLayout()
 
         right_scroll = QScrollArea(self)
@@ -429,54 +625,54 @@ class WeaponListPage(QWidget):
         right_scroll.setWidget(self.translate_block)
         right_panel_layout.addWidget(right_scroll, stretch=1)
         right_panel_layout.addLayout(temp_layout)
-        right_panel.setLayout(right_panel_layout)
+        self.right_panel.setLayout(right_panel_layout)
+
+        left_panel = QWidget()
+        left_panel_layout = QVBoxLayout()
+        left_panel_layout.setContentsMargins(0, 0, 0, 0)
+        left_panel_layout.addWidget(self._setup_progress_bar())
+        left_panel_layout.addWidget(self.weapon_list, stretch=1)
+        left_panel.setLayout(left_panel_layout)
 
-        splitter.addWidget(self.weapon_list)
-        splitter.addWidget(right_panel)
+        splitter.addWidget(left_panel)
+        splitter.addWidget(self.right_panel)
         main_layout.addWidget(splitter)
 
         self.setLayout(main_layout)
 
     def update_ui(self):
-        self.weapon_list.clear()
-        for hull_id in self.data_holder.ship_hulls.keys():
-            self.weapon_list.addItem(hull_id)
+        self.weapon_list.set_ids(self.weapon_id_list)
         if len(self.weapon_list) > 0:
             self.translate_block.load_data(self.data_holder.weapons[self.weapon_id_list[0]],
                                            self.data_holder.translates["WEAPON"].get(self.weapon_id_list[0]))
 
-    def _list_clicked(self, item):
-        item_id = item.text()
+    def _list_clicked(self, item_id: str):
         if item_id != self.translate_block.weapon.id:
             if self.__check_jump_without_saving():
                 self.translate_block.load_data(self.data_holder.weapons[item_id],
                                                self.data_holder.translates["WEAPON"].get(item_id))
 
     def _prev_clicked(self):
-        now_id = self.translate_block.weapon.id
-        now_index = self.weapon_id_list.index(now_id)
+        prev_id = self.weapon_list.neighbour(self.translate_block.weapon.id, -1)
         # already top
-        if now_index == 0:
+        if prev_id is None:
             QMessageBox.question(self, "", self.ui_str["msg_first_in_list"],
                                  QMessageBox.Close, QMessageBox.Close)
         else:
             if self.__check_jump_without_saving():
-                prev_id = self.weapon_id_list[now_index - 1]
-                self.weapon_list.setCurrentRow(now_index - 1)
+                self.weapon_list.select(prev_id)
                 self.translate_block.load_data(self.data_holder.weapons[prev_id],
                                                self.data_holder.translates["WEAPON"].get(prev_id))
 
     def _next_clicked(self):
-        now_id = self.translate_block.weapon.id
-        now_index = self.weapon_id_list.index(now_id)
+        next_id = self.weapon_list.neighbour(self.translate_block.weapon.id, 1)
         # already bottom
-        if now_index >= len(self.weapon_id_list) - 1:
+        if next_id is None:
             QMessageBox.question(self, "", self.ui_str["msg_last_in_list"],
                                  QMessageBox.Close, QMessageBox.Close)
         else:
             if self.__check_jump_without_saving():
-                next_id = self.weapon_id_list[now_index + 1]
-                self.weapon_list.setCurrentRow(now_index + 1)
+                self.weapon_list.select(next_id)
                 self.translate_block.load_data(self.data_holder.weapons[next_id],
                                                self.data_holder.translates["WEAPON"].get(next_id))
 
@@ -494,8 +690,7 @@ class WeaponListPage(QWidget):
         return True
 
     def update(self) -> None:
-        self.get_data(True)
-        self.update_ui()
+        self.get_data()
 
 
 class WeaponTranslateBlock(QWidget):
@@ -663,42 +858,55 @@ class WeaponTranslateBlock(QWidget):
                     self.translate_data[key] = edit.text()
                 elif isinstance(edit, QTextEdit):
                     self.translate_data[key] = edit.toPlainText()
-            self.data_holder.translates["WEAPON"][self.weapon.id] = self.translate_data
+            self.data_holder.set_translation("WEAPON", self.weapon.id, self.translate_data)
             QMessageBox.question(self, "", self.ui["msg_save_success"], QMessageBox.Close, QMessageBox.Close)
             self.is_edited = False
             return True
         return False
 
 
-class ShipSystemListPage(QWidget):
+class ShipSystemListPage(QWidget, BackgroundLoading):
     def __init__(self, parent, ui_str: dict, data_holder: prototypes.DataHolder):
         super().__init__(parent=parent)
         self.ui_str = ui_str
         self.data_holder = data_holder
         self.shipsystem_id_list = []
 
-        self.get_data()
         self._setup_ui()
 
-        self.update_ui()
+        self.get_data()
 
     def get_data(self, force_update: bool = False):
-        if self.data_holder.descriptions is None or force_update:
-            self.data_holder.descriptions = ModParser.parse_descriptions(self.data_holder.mod_path)
         if self.data_holder.ship_systems is None or force_update:
-            self.data_holder.ship_systems = ModParser.parse_ship_systems(self.data_holder.mod_path,
-                                                                         self.data_holder.descriptions.get(
-                                                                             "SHIP_SYSTEM"))
+            self._load_in_background(["ship_systems"], force_update)
+        else:
+            self.data_ready()
+
+    def data_ready(self):
         self.shipsystem_id_list = list(self.data_holder.ship_systems.keys())
+        self.update_ui()
+
+    def entities_changed(self, part: str, changed: set, ids_changed: bool):
+        if part != "ship_systems" or self.translate_block.ship_system is None:
+            return
+        now_id = self.translate_block.ship_system.id
+        if ids_changed:
+            self.shipsystem_id_list = list(self.data_holder.ship_systems.keys())
+            self.ship_system_list.set_ids(self.shipsystem_id_list)
+        if now_id not in self.data_holder.ship_systems:
+            self.update_ui()
+            return
+        self.ship_system_list.select(now_id)
+        if now_id in changed and not self.translate_block.is_edited:
+            self.translate_block.load_data(self.data_holder.ship_systems[now_id],
+                                           self.data_holder.translates["SHIP_SYSTEM"].get(now_id))
 
     def _setup_ui(self):
         main_layout = QHBoxLayout()
         splitter = QSplitter(self)
         # left_panel
-        self.ship_system_list = QListWidget()
-        self.ship_system_list.itemClicked.connect(self._ship_system_list_clicked)
-        for ship_system_id in self.data_holder.ship_systems.keys():
-            self.ship_system_list.addItem(ship_system_id)
+        self.ship_system_list = EntityList(self.ui_str)
+        self.ship_system_list.id_clicked.connect(self._ship_system_list_clicked)
         # right_main
         self.translate_block = ShipSystemTranslateBlock(self, self.ui_str, data_holder=self.data_holder)
         # right_under
@@ -719,7 +927,7 @@ class ShipSystemListPage(QWidget):
         temp_layout.addSpacing(1)
         temp_layout.addWidget(self.next_button)
 
-        right_panel = QFrame()
+        self.right_panel = QFrame()
         right_panel_layout = QVBoxLayout()
 
         right_scroll = QScrollArea(self)
@@ -729,54 +937,54 @@ class ShipSystemListPage(QWidget):
         right_scroll.setWidget(self.translate_block)
         right_panel_layout.addWidget(right_scroll, stretch=1)
         right_panel_layout.addLayout(temp_layout)
-        right_panel.setLayout(right_panel_layout)
+        self.right_panel.setLayout(right_panel_layout)
+
+        left_panel = QWidget()
+        left_panel_layout = QVBoxLayout()
+        left_panel_layout.setContentsMargins(0, 0, 0, 0)
+        left_panel_layout.addWidget(self._setup_progress_bar())
+        left_panel_layout.addWidget(self.ship_system_list, stretch=1)
+        left_panel.setLayout(left_panel_layout)
 
-        splitter.addWidget(self.ship_system_list)
-        splitter.addWidget(right_panel)
+        splitter.addWidget(left_panel)
+        splitter.addWidget(self.right_panel)
         main_layout.addWidget(splitter)
 
         self.setLayout(main_layout)
 
     def update_ui(self):
-        self.ship_system_list.clear()
-        for system_id in self.data_holder.ship_hulls.keys():
-            self.ship_system_list.addItem(system_id)
+        self.ship_system_list.set_ids(self.shipsystem_id_list)
         if len(self.ship_system_list) > 0:
             self.translate_block.load_data(self.data_holder.ship_systems[self.shipsystem_id_list[0]],
                                            self.data_holder.translates["SHIP_SYSTEM"].get(self.shipsystem_id_list[0]))
 
-    def _ship_system_list_clicked(self, item):
-        ship_system_id = item.text()
+    def _ship_system_list_clicked(self, ship_system_id: str):
         if ship_system_id != self.translate_block.ship_system.id:
             if self.__check_jump_without_saving():
                 self.translate_block.load_data(self.data_holder.ship_systems[ship_system_id],
                                                self.data_holder.translates["SHIP_SYSTEM"].get(ship_system_id))
 
     def _prev_clicked(self):
-        now_id = self.translate_block.ship_system.id
-        now_index = self.shipsystem_id_list.index(now_id)
+        prev_id = self.ship_system_list.neighbour(self.translate_block.ship_system.id, -1)
         # already top
-        if now_index == 0:
+        if prev_id is None:
             QMessageBox.question(self, "", self.ui_str["msg_first_in_list"],
                                  QMessageBox.Close, QMessageBox.Close)
         else:
             if self.__check_jump_without_saving():
-                prev_id = self.shipsystem_id_list[now_index - 1]
-                self.ship_system_list.setCurrentRow(now_index - 1)
+                self.ship_system_list.select(prev_id)
                 self.translate_block.load_data(self.data_holder.ship_systems[prev_id],
                                                self.data_holder.translates["SHIP_SYSTEM"].get(prev_id))
 
     def _next_clicked(self):
-        now_id = self.translate_block.ship_system.id
-        now_index = self.shipsystem_id_list.index(now_id)
+        next_id = self.ship_system_list.neighbour(self.translate_block.ship_system.id, 1)
         # already bottom
-        if now_index >= len(self.shipsystem_id_list) - 1:
+        if next_id is None:
             QMessageBox.question(self, "", self.ui_str["msg_last_in_list"],
                                  QMessageBox.Close, QMessageBox.Close)
         else:
             if self.__check_jump_without_saving():
-                next_id = self.shipsystem_id_list[now_index + 1]
-                self.ship_system_list.setCurrentRow(now_index + 1)
+                self.ship_system_list.select(next_id)
                 self.translate_block.load_data(self.data_holder.ship_systems[next_id],
                                                self.data_holder.translates["SHIP_SYSTEM"].get(next_id))
 
@@ -794,8 +1002,7 @@ class ShipSystemListPage(QWidget):
         return True
 
     def update(self) -> None:
-        self.get_data(True)
-        self.update_ui()
+        self.get_data()
 
 
 class ShipSystemTranslateBlock(QWidget):
@@ -928,39 +1135,55 @@ class ShipSystemTranslateBlock(QWidget):
                     self.translate_data[key] = edit.text()
                 elif isinstance(edit, QTextEdit):
                     self.translate_data[key] = edit.toPlainText()
-            self.data_holder.translates["SHIP_SYSTEM"][self.ship_system.id] = self.translate_data
+            self.data_holder.set_translation("SHIP_SYSTEM", self.ship_system.id, self.translate_data)
             QMessageBox.question(self, "", self.ui["msg_save_success"], QMessageBox.Close, QMessageBox.Close)
             self.is_edited = False
             return True
         return False
 
 
-class HullModListPage(QWidget):
+class HullModListPage(QWidget, BackgroundLoading):
     def __init__(self, parent, ui_str: dict, data_holder: prototypes.DataHolder):
         super().__init__(parent=parent)
         self.ui_str = ui_str
         self.data_holder = data_holder
         self.hullmod_id_list = []
 
-        self.get_data()
-
         self._setup_ui()
 
-        self.update_ui()
+        self.get_data()
 
     def get_data(self, force_update: bool = False):
         if self.data_holder.hullmods is None or force_update:
-            self.data_holder.hullmods = ModParser.parse_hullmods(self.data_holder.mod_path)
+            self._load_in_background(["hullmods"], force_update)
+        else:
+            self.data_ready()
+
+    def data_ready(self):
         self.hullmod_id_list = list(self.data_holder.hullmods.keys())
+        self.update_ui()
+
+    def entities_changed(self, part: str, changed: set, ids_changed: bool):
+        if part != "hullmods" or self.translate_block.item is None:
+            return
+        now_id = self.translate_block.item.id
+        if ids_changed:
+            self.hullmod_id_list = list(self.data_holder.hullmods.keys())
+            self.item_list.set_ids(self.hullmod_id_list)
+        if now_id not in self.data_holder.hullmods:
+            self.update_ui()
+            return
+        self.item_list.select(now_id)
+        if now_id in changed and not self.translate_block.is_edited:
+            self.translate_block.load_data(self.data_holder.hullmods[now_id],
+                                           self.data_holder.translates["HULLMOD"].get(now_id))
 
     def _setup_ui(self):
         main_layout = QHBoxLayout()
         splitter = QSplitter(self)
         # left_panel
-        self.item_list = QListWidget()
-        self.item_list.itemClicked.connect(self._list_clicked)
-        for item_id in self.data_holder.hullmods.keys():
-            self.item_list.addItem(item_id)
+        self.item_list = EntityList(self.ui_str)
+        self.item_list.id_clicked.connect(self._list_clicked)
         # right_main
         self.translate_block = HullModTranslateBlock(self, self.ui_str, data_holder=self.data_holder)
         # right_under
@@ -981,7 +1204,7 @@ class HullModListPage(QWidget):
         temp_layout.addSpacing(1)
         temp_layout.addWidget(self.next_button)
 
-        right_panel = QFrame()
+        self.right_panel = QFrame()
         right_panel_layout = QVBoxLayout()
 
         right_scroll = QScrollArea(self)
@@ -991,53 +1214,55 @@ class HullModListPage(QWidget):
         right_scroll.setWidget(self.translate_block)
         right_panel_layout.addWidget(right_scroll, stretch=1)
         right_panel_layout.addLayout(temp_layout)
-        right_panel.setLayout(right_panel_layout)
+        self.right_panel.setLayout(right_panel_layout)
+
+        left_panel = QWidget()
+        left_panel_layout = QVBoxLayout()
+        left_panel_layout.setContentsMargins(0, 0, 0, 0)
+        left_panel_layout.addWidget(self._setup_progress_bar())
+        left_panel_layout.addWidget(self.item_list, stretch=1)
+        left_panel.setLayout(left_panel_layout)
 
-        splitter.addWidget(self.item_list)
-        splitter.addWidget(right_panel)
+        splitter.addWidget(left_panel)
+        splitter.addWidget(self.right_panel)
         main_layout.addWidget(splitter)
 
         self.setLayout(main_layout)
 
     def update_ui(self):
-        self.item_list.clear()
-        for system_id in self.data_holder.hullmods.keys():
-            self.item_list.addItem(system_id)
+        self.item_list.set_ids(self.hullmod_id_list)
         if len(self.item_list) > 0:
             self.translate_block.load_data(self.data_holder.hullmods[self.hullmod_id_list[0]],
                                            None)
 
-    def _list_clicked(self, item):
-        item_id = item.text()
+    def _list_clicked(self, item_id: str):
         if item_id != self.translate_block.item.id:
             self._jump_to_item(item_id)
 
     def _jump_to_item(self, item_id):
         if self.__check_jump_without_saving():
-            self.item_list.setCurrentRow(self.hullmod_id_list.index(item_id))
+            self.item_list.select(item_id)
             self.translate_block.load_data(self.data_holder.hullmods[item_id],
                                            self.data_holder.translates["HULLMOD"].get(item_id))
 
     def _prev_clicked(self):
-        now_id = self.translate_block.item.id
-        now_index = self.hullmod_id_list.index(now_id)
+        prev_id = self.item_list.neighbour(self.translate_block.item.id, -1)
         # already top
-        if now_index <= 0:
+        if prev_id is None:
             QMessageBox().information(self, "", self.ui_str["msg_first_in_list"],
                                       QMessageBox.Close, QMessageBox.Close)
         else:
             # jump to prev one
-            self._jump_to_item(self.hullmod_id_list[now_index - 1])
+            self._jump_to_item(prev_id)
 
     def _next_clicked(self):
-        now_id = self.translate_block.item.id
-        now_index = self.hullmod_id_list.index(now_id)
+        next_id = self.item_list.neighbour(self.translate_block.item.id, 1)
         # already bottom
-        if now_index >= len(self.hullmod_id_list) - 1:
+        if next_id is None:
             QMessageBox().question(self, "", self.ui_str["msg_last_in_list"],
                                    QMessageBox.Close, QMessageBox.Close)
         else:
-            self._jump_to_item(self.hullmod_id_list[now_index + 1])
+            self._jump_to_item(next_id)
 
     def _save_clicked(self):
         self.translate_block.save_translation()
@@ -1053,8 +1278,7 @@ class HullModListPage(QWidget):
         return True
 
     def update(self) -> None:
-        self.get_data(True)
-        self.update_ui()
+        self.get_data()
 
 
 class HullModTranslateBlock(QWidget):
@@ -1144,7 +1368,7 @@ class HullModTranslateBlock(QWidget):
                     self.translate_data[key] = edit.text()
                 elif isinstance(edit, QTextEdit):
                     self.translate_data[key] = edit.toPlainText()
-            self.data_holder.translates["HULLMOD"][self.item.id] = self.translate_data
+            self.data_holder.set_translation("HULLMOD", self.item.id, self.translate_data)
             QMessageBox().information(self, "", self.ui["msg_save_success"], QMessageBox.Close, QMessageBox.Close)
             self.is_edited = False
             return True
@@ -1,12 +1,22 @@
+import codecs
 import configparser
 import csv
+import io
+import json
 import logging
-from collections import deque
+import os
+import re
 
 import chardet
 import json5
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from prototypes import *
+from table import DESCRIPTION_TABLE, ENTITY_TABLES, EntityTable, normalize_newlines, read_record, record_span
 
 
 def parse_ui_str(lang_file_path) -> dict:
@@ -33,224 +43,253 @@ def parse_mod_data(mod_path):
 
 
 class ModParser:
+    # chardet only reads this many leading bytes when BOM and utf-8 checks both fail
+    ENCODING_SAMPLE_SIZE = 64 * 1024
+    # a run of plain text and quoted strings (kept as group 1) or a #-comment up to the line end (dropped)
+    __hash_comment_pattern = re.compile(r"""((?:[^"'#]+|"(?:[^"\\\n]|\\.)*"?|'(?:[^'\\\n]|\\.)*'?)+)|#[^\n]*""")
+    # a quoted string (kept as group 1) or a comma right before a closing bracket (dropped)
+    __trailing_comma_pattern = re.compile(r"""("(?:[^"\\\n]|\\.)*"?)|,(?=\s*[]}])""")
+    # source -> decoder that finally loaded it: "orjson", "json" or "json5"
+    json_load_path: dict[str, str] = {}
+    # longer boms first, utf-32-le starts with the utf-16-le one
+    __boms = ((codecs.BOM_UTF32_LE, "utf-32"),
+              (codecs.BOM_UTF32_BE, "utf-32"),
+              (codecs.BOM_UTF8, "utf-8-sig"),
+              (codecs.BOM_UTF16_LE, "utf-16"),
+              (codecs.BOM_UTF16_BE, "utf-16"))
+    # absolute path -> ((size, mtime_ns), encoding), shared by parse and inject
+    __encoding_cache: dict[str, tuple[tuple[int, int], str]] = {}
+    # encodings in which a comma, quote or line break byte is always that character, see row_index
+    INDEXABLE_ENCODINGS = ("utf-8", "utf-8-sig", "gbk", "latin_1")
+    # absolute path -> row index, or {"fingerprint": (size, mtime_ns)} for a file that can't be indexed
+    __row_indexes: dict[str, dict] = {}
+
+    # set to a cache.ParseCache to reuse parse results of unchanged files across sessions
+    cache = None
+
     @staticmethod
     def parse_descriptions(mod_path) -> dict:
-        result = {
-            "SHIP": {},
-            "SHIP_SYSTEM": {},
-            "WEAPON": {},
-            "RESOURCE": {},
-            "FACTION": {},
-            "CUSTOM": {}
-        }
-        file_path = mod_path + r"\data\strings\descriptions.csv"
+        file_path = os.path.join(mod_path, DESCRIPTION_TABLE.file_path)
+        return ModParser.__cached(DESCRIPTION_TABLE.kind, mod_path, file_path, ModParser.__parse_descriptions_file)
+
+    @staticmethod
+    def __parse_descriptions_file(file_path) -> dict:
         try:
-            csv_strings = ModParser.__read_text_file(file_path)
-            reader = csv.reader(csv_strings)
-            # separate headline
-            headers = next(reader)
-            id_col = headers.index("id")
-            type_col = headers.index("type")
-            for row in reader:
-                # skip empty cols & annotation
-                if len(row[id_col]) == 0 or row[0].startswith("#"):
-                    continue
-
-                # sort by type
-                type_str = row[type_col]
-                if type_str == "SHIP":
-                    slot_def = ShipHull.property_def["desc_csv"]
-                    # SHIP_HULL-Like desc
-                    item = dict()
-                    for key, value in slot_def.items():
-                        item[key] = row[headers.index(value)]
-                    result[type_str][row[id_col]] = item
-                elif type_str == "WEAPON":
-                    slot_def = Weapon.property_def["desc_csv"]
-                    item = dict()
-                    for key, value in slot_def.items():
-                        item[key] = row[headers.index(value)]
-                    result[type_str][row[id_col]] = item
-                elif type_str == "SHIP_SYSTEM":
-                    slot_def = ShipSystem.property_def["desc_csv"]
-                    item = dict()
-                    for key, value in slot_def.items():
-                        try:
-                            item[key] = row[headers.index(value)]
-                        except ValueError:
-                            item[key] = ""
-                    result[type_str][row[id_col]] = item
-                elif type_str == "FACTION":
-                    slot_def = Faction.property_def["desc_csv"]
-                    item = dict()
-                    for key, value in slot_def.items():
-                        item[key] = row[headers.index(value)]
-                    result[type_str][row[id_col]] = item
-                elif type_str == "RESOURCE":
-                    slot_def = Resource.property_def["desc_csv"]
-                    item = dict()
-                    for key, value in slot_def.items():
-                        item[key] = row[headers.index(value)]
-                    result[type_str][row[id_col]] = item
-                elif type_str == "CUSTOM":
-                    item = {"description": row[headers.index("text1")],
-                            "market_desc": row[headers.index("text3")]}
-                    result[type_str][row[id_col]] = item
+            return DESCRIPTION_TABLE.parse(io.StringIO(ModParser.read_text(file_path)))
         # file parse failed
         except ValueError:
             return {}
         # file read failed
         except OSError:
             return {}
-        return result
 
     @staticmethod
     def parse_ship_systems(mod_path, shipsystem_descriptions) -> dict:
-        result = {}
-        file_path = mod_path + r"\data\shipsystems\ship_systems.csv"
-        # check encoding
-        try:
-            csv_strings = ModParser.__read_text_file(file_path)
-            reader = csv.reader(csv_strings)
-            # separate headline
-            headers = next(reader)
-            id_col = headers.index("id")
-            name_col = headers.index("name")
-            for row in reader:
-                # skip empty cols & annotation
-                if len(row[id_col]) == 0 or row[0].startswith("#"):
-                    continue
-
-                system_id = row[id_col]
-                system_desc = shipsystem_descriptions.get(system_id, None)
-                system = ShipSystem(system_id, row[name_col])
-                if system_desc is not None:
-                    for key in ShipSystem.property_def["desc_csv"].keys():
-                        system.__setattr__(key, system_desc[key])
-                result[system_id] = system
-            return result
-        except OSError:
-            logging.warning("file(%s) read failed", file_path)
-            return {}
-        except ValueError:
-            logging.warning("file(%s) parse failed,wrong encoding", file_path)
-            return {}
+        result = ModParser.__parse_table(ENTITY_TABLES["SHIP_SYSTEM"], mod_path)
+        return ModParser.attach_descriptions(result, shipsystem_descriptions)
 
     @staticmethod
     def parse_hullmods(mod_path) -> dict:
-        result = {}
-        file_path = mod_path + r"\\data\hullmods\hull_mods.csv"
-        # check encoding
+        return ModParser.__parse_table(ENTITY_TABLES["HULLMOD"], mod_path)
+
+    @staticmethod
+    def parse_hulls(mod_path, hull_descriptions) -> dict:
+        result = ModParser.__parse_table(ENTITY_TABLES["SHIP"], mod_path)
+        return ModParser.attach_descriptions(result, hull_descriptions)
+
+    @staticmethod
+    def parse_weapons(mod_path, weapon_descriptions) -> dict:
+        result = ModParser.__parse_table(ENTITY_TABLES["WEAPON"], mod_path)
+        return ModParser.attach_descriptions(result, weapon_descriptions)
+
+    @staticmethod
+    def parse_entities(mod_path, kind: str) -> dict:
+        """
+        :param kind: key of ENTITY_TABLES
+        :return: id -> entity of the whole csv, descriptions not attached
+        """
+        return ModParser.__parse_table(ENTITY_TABLES[kind], mod_path)
+
+    @staticmethod
+    def __parse_table(table: EntityTable, mod_path) -> dict:
+        def parse_file(file_path) -> dict:
+            try:
+                return table.parse(io.StringIO(ModParser.read_text(file_path)))
+            except OSError:
+                logging.warning("file(%s) read failed", file_path)
+                return {}
+            except ValueError:
+                logging.warning("file(%s) parse failed,wrong encoding", file_path)
+                return {}
+
+        return ModParser.__cached(table.kind, mod_path, os.path.join(mod_path, table.file_path), parse_file)
+
+    @staticmethod
+    def attach_descriptions(entities: dict, descriptions: dict | None) -> dict:
+        """
+        Copy descriptions.csv texts onto the parsed entities sharing their id.
+        :param entities: id -> Weapon/ShipHull/ShipSystem
+        :param descriptions: one type group of parse_descriptions()
+        :return: entities
+        """
+        if descriptions:
+            for entity_id, entity in entities.items():
+                entity_desc = descriptions.get(entity_id)
+                if entity_desc is not None:
+                    for key, value in entity_desc.items():
+                        entity.__setattr__(key, value)
+        return entities
+
+    @staticmethod
+    def __cached(kind: str, mod_path, file_path, parse_file) -> dict:
+        cache = ModParser.cache
+        if cache is None:
+            return parse_file(file_path)
+        fingerprints = cache.fingerprints([file_path])
+        result = cache.get(mod_path, kind, fingerprints)
+        if result is None:
+            result = parse_file(file_path)
+            # failed parses are not cached, the file may be fixed without being touched
+            if result:
+                cache.put(mod_path, kind, fingerprints, result)
+        return result
+
+    @staticmethod
+    def row_index(table, mod_path) -> dict | None:
+        """
+        Byte offsets of the rows of one csv of a mod, built in one scan and kept by (path, size, mtime_ns)
+        in memory and in the parse cache.
+        :param table: EntityTable or DescriptionTable of the csv
+        :return: {"fingerprint": (size, mtime_ns), "encoding": codec of the records, "headers": header row,
+                 "rows": id -> offset (type -> id -> offset for descriptions.csv), "bounds": record offsets},
+                 see table.index_rows; None when the file can't be read or indexed
+        """
+        file_path = os.path.join(mod_path, table.file_path)
         try:
-            csv_strings = ModParser.__read_text_file(file_path)
-            reader = csv.reader(csv_strings)
-            # separate headline
-            headers = next(reader)
-            id_col = headers.index("id")
-            name_col = headers.index("name")
-            for row in reader:
-                # skip empty cols & annotation
-                if len(row[id_col]) == 0 or row[0].startswith("#"):
-                    continue
-                hullmod_id = row[id_col]
-                hullmod = HullMod(hullmod_id)
-                hullmod.name = row[name_col]
-                hullmod.description = row[headers.index("desc")]
-                result[hullmod_id] = hullmod
-            return result
+            stat = os.stat(file_path)
         except OSError:
-            logging.warning("file(%s) read failed", file_path)
-            return {}
-        except ValueError:
-            logging.warning("file(%s) parse failed,wrong encoding", file_path)
-            return {}
+            return None
+        fingerprint = (stat.st_size, stat.st_mtime_ns)
+        index = ModParser.__row_indexes.get(os.path.abspath(file_path))
+        if index is not None and index["fingerprint"] == fingerprint:
+            # a file that failed to index has no rows, it is not scanned again until it changes
+            return index if "rows" in index else None
+
+        cache = ModParser.cache
+        index = None
+        if cache is not None:
+            fingerprints = cache.fingerprints([file_path])
+            index = cache.get(mod_path, table.kind + "_INDEX", fingerprints)
+        if index is None:
+            index = ModParser.__build_row_index(table, file_path)
+            if index is None:
+                ModParser.__row_indexes[os.path.abspath(file_path)] = {"fingerprint": fingerprint}
+                return None
+            if cache is not None:
+                cache.put(mod_path, table.kind + "_INDEX", fingerprints, index)
+        ModParser.__row_indexes[os.path.abspath(file_path)] = index
+        return index
 
     @staticmethod
-    def parse_hulls(mod_path, hull_descriptions) -> dict:
-        result = {}
-        file_path = mod_path + r"\data\hulls\ship_data.csv"
+    def __build_row_index(table, file_path) -> dict | None:
         try:
-            csv_strings = ModParser.__read_text_file(file_path)
-            reader = csv.reader(csv_strings)
-            # separate headline
-            headers = next(reader)
-            id_col = headers.index("id")
-            name_col = headers.index("name")
-            for row in reader:
-                # skip empty cols & annotation
-                if len(row[id_col]) == 0 or row[0].startswith("#"):
-                    continue
-                hull_desc = hull_descriptions.get(row[id_col], None)
-                hull = ShipHull(row[id_col], row[name_col], row[2], row[3])
-                if hull_desc is not None:
-                    for key in ShipHull.property_def["desc_csv"].keys():
-                        hull.__setattr__(key, hull_desc[key])
-                result[row[id_col]] = hull
-            return result
+            with open(file_path, "rb") as binary_file:
+                stat = os.fstat(binary_file.fileno())
+                raw = binary_file.read()
+            encoding = ModParser.__encoding(file_path, stat, raw)[0]
+            if encoding not in ModParser.INDEXABLE_ENCODINGS:
+                return None
+            start = 0
+            if encoding == "utf-8-sig":
+                encoding, start = "utf-8", len(codecs.BOM_UTF8)
+            result = table.index(raw, encoding, start)
         except OSError:
             logging.warning("file(%s) read failed", file_path)
-            return {}
-        except ValueError:
-            logging.warning("file(%s) parse failed,wrong encoding", file_path)
-            return {}
+            return None
+        except (ValueError, csv.Error) as e:
+            logging.warning("file(%s) index failed: %s", file_path, e)
+            return None
+        if result is None:
+            logging.info("file(%s) has irregular quoting, not indexed", file_path)
+            return None
+        return {"fingerprint": (stat.st_size, stat.st_mtime_ns), "encoding": encoding,
+                "headers": result[0], "rows": result[1], "bounds": result[2]}
 
     @staticmethod
-    def parse_weapons(mod_path, weapon_descriptions) -> dict:
-        result = {}
-        file_path = mod_path + r"\data\weapons\weapon_data.csv"
+    def __read_record(table, mod_path, entity_id, group: str | None = None) \
+            -> tuple[list[str], list[str] | None] | None:
+        """
+        :param group: type of the row in descriptions.csv
+        :return: header row and the cells of the row, None for the cells when the row is not in the file;
+                 None when the file can't be read through its row index
+        """
+        index = ModParser.row_index(table, mod_path)
+        if index is None:
+            return None
+        rows = index["rows"] if group is None else index["rows"].get(group, {})
+        offset = rows.get(entity_id)
         try:
-            csv_string = ModParser.__read_text_file(file_path)
-            reader = csv.reader(csv_string)
-            # separate headline
-            headers = next(reader)
-            id_col = headers.index("id")
-            name_col = headers.index("name")
-            hint_col = headers.index("hints")
-            tech_col = headers.index("tech/manufacturer")
-            role_col = headers.index("primaryRoleStr")
-
-            speed_col = headers.index("speedStr")
-            tracking_col = speed_col + 1
-            turn_col = tracking_col + 1
-            acc_col = turn_col + 1
-            primary_str = headers.index("customPrimary")
-            for row in reader:
-                # skip empty cols & annotation
-                if len(row[id_col]) == 0 or row[0].startswith("#"):
-                    continue
-                is_system_weapon = "SYSTEM" in row[hint_col]
-                weapon = Weapon(row[id_col], is_system_weapon, row[name_col], row[tech_col], row[role_col])
-                weapon.fly_speed = row[speed_col]
-                weapon.tracking = row[tracking_col]
-                weapon.accuracy = row[acc_col]
-                weapon.turn_rate = row[turn_col]
-                weapon.special_effect_1 = row[primary_str]
-                weapon.special_effect_1_hl = row[primary_str + 1]
-                weapon.special_effect_2 = row[primary_str + 2]
-                weapon.special_effect_2_hl = row[primary_str + 3]
-                weapon_desc = weapon_descriptions.get(row[id_col])
-                if weapon_desc is not None:
-                    weapon.description = weapon_desc["description"]
-                    weapon.desc_foot_note = weapon_desc["desc_foot_note"]
-                result[row[id_col]] = weapon
-            return result
+            with open(os.path.join(mod_path, table.file_path), "rb") as binary_file:
+                stat = os.fstat(binary_file.fileno())
+                # written since the index was taken
+                if (stat.st_size, stat.st_mtime_ns) != index["fingerprint"]:
+                    return None
+                if offset is None:
+                    return index["headers"], None
+                offset, length = record_span(index["bounds"], offset)
+                binary_file.seek(offset)
+                raw = binary_file.read(length)
         except OSError:
-            logging.warning("file(%s) read failed", file_path)
-            return {}
-        except ValueError:
-            logging.warning("file(%s) parse failed,wrong encoding", file_path)
-            return {}
+            return None
+        return index["headers"], read_record(raw, index["encoding"])
 
     @staticmethod
-    def parse_metadata(mod_path) -> (ModInfo, dict):
-        file_path = mod_path + r"\mod_info.json"
+    def read_entity(mod_path, kind: str, entity_id: str):
+        """
+        Read a single entity with one seek through row_index instead of parsing its whole csv,
+        the whole csv is only parsed when it can't be indexed. Descriptions are not attached.
+        :param kind: key of ENTITY_TABLES
+        :return: Weapon/ShipHull/ShipSystem/HullMod, None when the id is not in the file
+        """
+        table = ENTITY_TABLES[kind]
+        record = ModParser.__read_record(table, mod_path, entity_id)
+        if record is None:
+            return ModParser.__parse_table(table, mod_path).get(entity_id)
+        headers, row = record
+        if row is None:
+            return None
         try:
-            # read file
-            file_strs = ModParser.__read_text_file(file_path)
-            # remove all #-leading annotations
-            json_strs = ModParser.__erase_hash_comment(file_strs)
+            return table.build(headers, row)
+        except (ValueError, IndexError) as e:
+            logging.warning("row(%s) of file(%s) read failed: %s", entity_id,
+                            os.path.join(mod_path, table.file_path), e)
+            return None
 
-            info_json: dict = json5.loads(''.join(json_strs))
+    @staticmethod
+    def read_description(mod_path, type_str: str, entity_id: str) -> dict | None:
+        """
+        read_entity() for one description of descriptions.csv.
+        :param type_str: type column of the row, e.g. "WEAPON"
+        :return: {key: text} as in parse_descriptions()[type_str], None when not in the file
+        """
+        record = ModParser.__read_record(DESCRIPTION_TABLE, mod_path, entity_id, type_str)
+        if record is None:
+            return (ModParser.parse_descriptions(mod_path).get(type_str) or {}).get(entity_id)
+        headers, row = record
+        if row is None:
+            return None
+        try:
+            return DESCRIPTION_TABLE.extract(headers, row)
+        except (ValueError, IndexError) as e:
+            logging.warning("row(%s) of file(%s) read failed: %s", entity_id,
+                            os.path.join(mod_path, DESCRIPTION_TABLE.file_path), e)
+            return None
+
+    @staticmethod
+    def parse_metadata(mod_path) -> (ModInfo, dict):
+        file_path = os.path.join(mod_path, "mod_info.json")
+        try:
+            info_json: dict = ModParser.parse_json_file(file_path)
             metadata = ModInfo(info_json["id"], info_json["name"])
             metadata.game_version = info_json["gameVersion"]
             mod_version = info_json.get("version")
@@ -268,52 +307,139 @@ class ModParser:
             return None, None
 
     @staticmethod
-    def __erase_hash_comment(lines: list[str]) -> list[str]:
-        result = []
-        # removes hashtag#-leading comments
-        for line in lines:
-            hashtag_index = len(line)
-            quote_stack = deque()
-            for i in range(0, len(line)):
-                if line[i] == '#' and len(quote_stack) == 0:
-                    hashtag_index = i
-                    break
-                elif line[i] == "'":
-                    if "'" in quote_stack:
-                        while "'" in quote_stack:
-                            quote_stack.pop()
-                    else:
-                        quote_stack.append("'")
-                elif line[i] == '"':
-                    if '"' in quote_stack:
-                        while '"' in quote_stack:
-                            quote_stack.pop()
-                    else:
-                        quote_stack.append('"')
-            result.append(line[0: hashtag_index])
+    def erase_hash_comment(text: str) -> str:
+        """
+        Remove #-leading comments of Starsector json files in a single pass.
+        Quoted strings (with escapes) are matched first, so a # inside them is kept.
+        An unterminated quote ends at its line, like the game's loader does.
+        """
+        if "#" not in text:
+            return text
+        return ModParser.__hash_comment_pattern.sub(r"\1", text)
+
+    @staticmethod
+    def parse_json_file(file_path) -> dict | list:
+        """
+        Load a #-commented, json5-ish game file (mod_info.json, .skin, .variant, .faction ...)
+        :raise OSError: file not readable
+        :raise ValueError: file not decodable or no valid json
+        """
+        text = ModParser.read_text(file_path)
+        return ModParser.loads_json(text, file_path)
+
+    @staticmethod
+    def loads_json(text: str, source: str = "<string>") -> dict | list:
+        """
+        Decode json the fast way where possible.
+        Plain json goes straight to orjson/json, comments and trailing commas are stripped
+        before a second try, json5 gets the comment-free text for what is left (single quotes, unquoted keys ...).
+        :param source: key the decoder used is recorded under in json_load_path
+        :raise ValueError: no valid json5 either
+        """
+        try:
+            result, ModParser.json_load_path[source] = ModParser.__loads_std_json(text)
+            return result
+        except ValueError:
+            pass
+        text = ModParser.erase_hash_comment(text)
+        # only double quoted strings are protected, json5 gets the text with its commas
+        stripped = ModParser.__trailing_comma_pattern.sub(r"\1", text) if "," in text else text
+        try:
+            result, ModParser.json_load_path[source] = ModParser.__loads_std_json(stripped)
+            return result
+        except ValueError:
+            pass
+        result = json5.loads(text)
+        ModParser.json_load_path[source] = "json5"
         return result
 
     @staticmethod
-    def __read_text_file(file_path, strict_mode=True) -> list[str]:
-        common_encodings = ["gbk", "utf-8", "latin_1", ]
-        error = "strict" if strict_mode else "ignore"
+    def __loads_std_json(text: str) -> tuple[dict | list, str]:
+        if orjson is not None:
+            try:
+                return orjson.loads(text), "orjson"
+            except orjson.JSONDecodeError:
+                # orjson rejects raw control characters in strings, json(strict=False) doesn't
+                pass
+        return json.loads(text, strict=False), "json"
+
+    @staticmethod
+    def detect_encoding(file_path) -> str:
+        """
+        Detect the text encoding of a file, cached by (path, size, mtime_ns).
+        BOM first, then a strict utf-8 decode; chardet only looks at a bounded sample when both fail.
+        :param file_path:
+        :return: codec name usable by open()
+        """
+        stat = os.stat(file_path)
+        encoding = ModParser.__cached_encoding(file_path, stat)
+        if encoding is None:
+            with open(file_path, "rb") as binary_file:
+                raw = binary_file.read()
+            encoding = ModParser.__encoding(file_path, stat, raw)[0]
+        return encoding
+
+    @staticmethod
+    def read_text(file_path, strict_mode=True) -> str:
+        """
+        Read and decode a text file with a single read, an unknown encoding is sniffed from the same bytes.
+        Line breaks are translated like open() in text mode does.
+        :raise OSError: file not readable
+        :raise ValueError: file not decodable
+        """
         with open(file_path, "rb") as binary_file:
-            encoding_check = chardet.detect(binary_file.read())
-            encoding = encoding_check["encoding"]
-            confidence = encoding_check["confidence"]
-        if confidence > 0.9:
+            stat = os.fstat(binary_file.fileno())
+            raw = binary_file.read()
+        # the strict decode of a sniff is the text itself
+        encoding, text = ModParser.__encoding(file_path, stat, raw)
+        if text is None:
             try:
-                file = open(file_path, "rt", encoding=encoding, errors=error)
-                return file.readlines()
-            except Exception as e:
-                print(e)
+                text = raw.decode(encoding, "strict" if strict_mode else "ignore")
+            except UnicodeError as e:
+                logging.warning("file(%s) decode failed: %s", file_path, e)
                 raise ValueError("encoding error:incorrect encoding,file not read")
-        else:
-            for encoding in common_encodings:
-                file = open(file_path, "rt", encoding=encoding, errors=error)
-                try:
-                    lines = file.readlines()
-                    return lines
-                except Exception as e:
-                    file.close()
-            raise ValueError("encoding error:incorrect encoding,file not read")
+        return normalize_newlines(text)
+
+    @staticmethod
+    def __encoding(file_path, stat, raw: bytes) -> (str, str | None):
+        """
+        :param raw: content of the file at stat
+        :return: encoding, text of raw when it had to be sniffed
+        :raise ValueError: no encoding decodes raw
+        """
+        encoding = ModParser.__cached_encoding(file_path, stat)
+        if encoding is not None:
+            return encoding, None
+        encoding, text = ModParser.__sniff_encoding(raw)
+        ModParser.__encoding_cache[os.path.abspath(file_path)] = ((stat.st_size, stat.st_mtime_ns), encoding)
+        return encoding, text
+
+    @staticmethod
+    def __cached_encoding(file_path, stat) -> str | None:
+        cached = ModParser.__encoding_cache.get(os.path.abspath(file_path))
+        if cached is not None and cached[0] == (stat.st_size, stat.st_mtime_ns):
+            return cached[1]
+        return None
+
+    @staticmethod
+    def __sniff_encoding(raw: bytes) -> (str, str | None):
+        """
+        :return: encoding, text of raw when the check already decoded it
+        """
+        for bom, encoding in ModParser.__boms:
+            if raw.startswith(bom):
+                return encoding, None
+        try:
+            return "utf-8", raw.decode("utf-8")
+        except UnicodeDecodeError:
+            pass
+        encoding_check = chardet.detect(raw[:ModParser.ENCODING_SAMPLE_SIZE])
+        candidates = ["gbk", "latin_1"]
+        if encoding_check["encoding"] and encoding_check["confidence"] > 0.9:
+            candidates.insert(0, encoding_check["encoding"])
+        for encoding in candidates:
+            try:
+                return encoding, raw.decode(encoding)
+            except (UnicodeDecodeError, LookupError):
+                pass
+        raise ValueError("encoding error:incorrect encoding,file not read")
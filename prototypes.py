@@ -1,15 +1,36 @@
-import re
+import os.path
 from abc import abstractmethod, ABCMeta
 
+import highlight
+
 
 class UniversalConfigs:
     HIGHLIGHT_COLOR = "red"
 
 
+def _memoized(entity, name: str, render, *sources) -> str:
+    """
+    render(*sources), kept in entity._rendered until one of the sources changes.
+    Navigating the editor and exporting read the same derived strings over and over.
+    :param name: what is rendered, e.g. "special_effect_1_display"
+    """
+    rendered = getattr(entity, "_rendered", None)
+    if rendered is None:
+        # created on first use, parsed entities are pickled without it
+        rendered = entity._rendered = {}
+    hit = rendered.get(name)
+    if hit is not None and hit[0] == sources:
+        return hit[1]
+    value = render(*sources)
+    rendered[name] = (sources, value)
+    return value
+
+
 class ShipSystem:
     """
     舰船的战术系统.
     """
+    __slots__ = ("id", "name", "system_type", "desc_in_codex", "desc_on_ship", "highlights", "_rendered")
     property_def = {
         "id": "id",
         "name": "name",
@@ -37,40 +58,19 @@ class ShipSystem:
 
     @property
     def desc_on_ship_display(self) -> str:
-        if len(self.highlights) == 0:
+        if not self.highlights:
             return self.desc_on_ship
-        else:
-            desc_in_html = self.desc_on_ship
-            tag_symbol = "%#s#%"
-            for tag in self.highlights.split("|"):
-                desc_in_html = desc_in_html.replace(tag, tag_symbol, 1)
-            for tag in self.highlights.split("|"):
-                # add style wrapping to change color
-                hi_light_html = r"<font color=" + UniversalConfigs.HIGHLIGHT_COLOR + r">" + tag + r"</font> "
-                #
-                desc_in_html = desc_in_html.replace(tag_symbol, hi_light_html, 1)
-            return desc_in_html
+        return _memoized(self, "desc_on_ship_display", highlight.render_inline,
+                         self.desc_on_ship, self.highlights, UniversalConfigs.HIGHLIGHT_COLOR)
 
     @property
     def desc_on_ship_trans(self) -> str:
-        if len(self.highlights) == 0:
+        if not self.highlights:
             return self.desc_on_ship
-        else:
-            text = self.desc_on_ship
-            tag_symbol = "%#s#%"
-            for tag in self.highlights.split("|"):
-                text = text.replace(tag, tag_symbol, 1)
-            for tag in self.highlights.split("|"):
-                text = text.replace(tag_symbol, "{{" + tag + "}}", 1)
-            return text
+        return _memoized(self, "desc_on_ship_trans", highlight.decode_inline, self.desc_on_ship, self.highlights)
 
     def set_desc_on_ship_trans(self, desc_on_ship_str: str):
-        highlights = re.findall(r"\{\{(.+?)\}\}", desc_on_ship_str, )
-        if len(highlights) == 0:
-            self.highlights = ""
-        else:
-            self.highlights = " | ".join(highlights)
-        self.desc_on_ship = re.sub(r"\{\{|\}\}", "", desc_on_ship_str)
+        self.desc_on_ship, self.highlights = highlight.encode_inline(desc_on_ship_str)
 
 
 class HullLike:
@@ -78,6 +78,8 @@ class HullLike:
     一艘完好,能够进行装配的船壳.
     """
     __metaclass__ = ABCMeta
+    # lets ShipHull stay dict-free, subclasses without __slots__ still get a __dict__
+    __slots__ = ()
 
     @property
     @abstractmethod
@@ -109,6 +111,7 @@ class ShipHull(HullLike):
     """
     基本船体数据.
     """
+    __slots__ = ("_id", "name", "role", "tech", "desc_long", "desc_short", "desc_fleet", "_shipsystem")
     property_def = {
         "id": "id",
         "name": "name",
@@ -227,6 +230,9 @@ class ShipSkin(HullLike):
 
 
 class Weapon:
+    __slots__ = ("id", "is_system_weapon", "name", "role", "tech", "description", "desc_foot_note",
+                 "accuracy", "turn_rate", "fly_speed", "tracking",
+                 "special_effect_1", "special_effect_1_hl", "special_effect_2", "special_effect_2_hl", "_rendered")
     property_def = {
         "id": "id",
 
@@ -237,6 +243,11 @@ class Weapon:
         "fly_speed": "speedStr",
         "tracking": "trackingStr",
         "turn_rate": "turnRateStr",
+        "is_system_weapon": "hints",
+        "special_effect_1": "customPrimary",
+        "special_effect_1_hl": "customPrimaryHL",
+        "special_effect_2": "customAncillary",
+        "special_effect_2_hl": "customAncillaryHL",
         "desc_csv": {
             "description": "text1",
             "desc_foot_note": "text2"
@@ -271,55 +282,38 @@ class Weapon:
 
     @property
     def special_effect_1_display(self) -> str:
-        if len(self.special_effect_1_hl) == 0:
+        if not self.special_effect_1_hl:
             return self.special_effect_1
-        else:
-            display_text = self.special_effect_1
-            highlights = self.special_effect_1_hl.split("|")
-            for highlight in highlights:
-                tag_symbol = "<font color=" + UniversalConfigs.HIGHLIGHT_COLOR + ">" + highlight + "</font>"
-                display_text = display_text.replace("%s", tag_symbol, 1)
-            return display_text
+        return _memoized(self, "special_effect_1_display", highlight.render_percent,
+                         self.special_effect_1, self.special_effect_1_hl, UniversalConfigs.HIGHLIGHT_COLOR)
 
     @property
     def special_effect_2_display(self) -> str:
-        if len(self.special_effect_2_hl) == 0:
+        if not self.special_effect_2_hl:
             return self.special_effect_2
-        else:
-            display_text = self.special_effect_2
-            highlights = self.special_effect_2_hl.split("|")
-            for highlight in highlights:
-                tag_symbol = "<font color=" + UniversalConfigs.HIGHLIGHT_COLOR + ">" + highlight + "</font>"
-                display_text = display_text.replace("%s", tag_symbol, 1)
-            return display_text
+        return _memoized(self, "special_effect_2_display", highlight.render_percent,
+                         self.special_effect_2, self.special_effect_2_hl, UniversalConfigs.HIGHLIGHT_COLOR)
 
     @property
     def special_effect_1_trans(self) -> str:
-        if len(self.special_effect_1_hl) == 0:
+        if not self.special_effect_1_hl:
             return self.special_effect_1
-        else:
-            display_text = self.special_effect_1
-            high_lights = self.special_effect_1_hl.split("|")
-            for high_light in high_lights:
-                display_text = display_text.replace("%s", "{{" + high_light + "}}", 1)
-            return display_text
+        return _memoized(self, "special_effect_1_trans", highlight.decode_percent,
+                         self.special_effect_1, self.special_effect_1_hl)
 
     @property
     def special_effect_2_trans(self) -> str:
-        if len(self.special_effect_2_hl) == 0:
+        if not self.special_effect_2_hl:
             return self.special_effect_2
-        else:
-            display_text = self.special_effect_2
-            high_lights = self.special_effect_2_hl.split("|")
-            for high_light in high_lights:
-                display_text = display_text.replace("%s", "{{" + high_light + "}}", 1)
-            return display_text
+        return _memoized(self, "special_effect_2_trans", highlight.decode_percent,
+                         self.special_effect_2, self.special_effect_2_hl)
 
 
 class Faction:
     """
     Faction data.
     """
+    __slots__ = ("id", "name", "name_article", "name_long", "name_long_article", "ship_prefix", "ranks", "fleet_type")
     property_def = {
         "id": "id",
         "name": "displayName",
@@ -394,6 +388,7 @@ class ModInfo:
 
 
 class Resource:
+    __slots__ = ("id", "name", "description")
     property_def = {
         "id": "id",
         "name": "name",
@@ -424,6 +419,7 @@ class WholeMOD:
 
 
 class HullMod:
+    __slots__ = ("id", "name", "description")
     property_def = {
         "id": "id",
         "name": "name",
@@ -453,6 +449,8 @@ class DataHolder:
 
         self.metadata: ModInfo | None = None
         self.translates: dict[str, dict[str, dict]] = self.empty_translate
+        # journal.TranslationJournal of the mod, set_translation() appends every save to it
+        self.journal = None
 
         self.descriptions: dict | None = None
 
@@ -465,29 +463,49 @@ class DataHolder:
         self.factions: dict[str, Faction] | None = None
         self.hullmods: dict[str, HullMod] | None = None
 
+        # bumped by clear(), background loads of a previous mod compare against it
+        self.generation: int = 0
+
     @property
     def description_csv_path(self):
         if self.mod_path:
-            return self.mod_path + r"\data\strings\descriptions.csv"
+            return os.path.join(self.mod_path, "data", "strings", "descriptions.csv")
         else:
             return None
 
     @property
     def hull_csv_path(self):
-        return self.mod_path + r"\data\hulls\ship_data.csv"
+        return os.path.join(self.mod_path, "data", "hulls", "ship_data.csv")
 
     @property
     def weapon_csv_path(self):
-        return self.mod_path + r"\data\weapons\weapon_data.csv"
+        return os.path.join(self.mod_path, "data", "weapons", "weapon_data.csv")
 
     @property
     def system_csv_path(self):
-        return self.mod_path + r"\data\shipsystems\ship_systems.csv"
+        return os.path.join(self.mod_path, "data", "shipsystems", "ship_systems.csv")
+
+    @property
+    def hullmod_csv_path(self):
+        return os.path.join(self.mod_path, "data", "hullmods", "hull_mods.csv")
 
     @property
     def mod_info_path(self):
-        return self.mod_path + r"\mod_info.json"
+        return os.path.join(self.mod_path, "mod_info.json")
+
+    def set_translation(self, category: str, entity_id: str | None, translation: dict):
+        """
+        Store the translation of one entity and journal it.
+        :param entity_id: None sets the whole category, e.g. MOD_META
+        """
+        if entity_id is None:
+            self.translates[category] = translation
+        else:
+            self.translates[category][entity_id] = translation
+        if self.journal is not None:
+            self.journal.record(category, entity_id, translation)
 
     def clear(self):
+        generation = self.generation + 1
         self.__init__(self.game_root_path, self.mod_path)
-        pass
+        self.generation = generation
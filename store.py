@@ -0,0 +1,227 @@
+import errno
+import os
+import sqlite3
+from collections.abc import MutableMapping
+
+import inject
+from parse import ModParser
+from prototypes import DataHolder
+
+STORE_SUFFIX = ".translatedb"
+# categories holding key -> text instead of id -> {field: text}
+FLAT_CATEGORIES = ("MOD_META",)
+
+
+class TranslationStore:
+    """
+    Translations in one SQLite file, a row per (category, id, field), the alternative to the single json
+    object of a .translate file. translates() is the dict-like view DataHolder.translates uses.
+    Rows of FLAT_CATEGORIES have an empty id. Entries keep the order they were first written in.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS translations (
+            category TEXT NOT NULL,
+            id TEXT NOT NULL,
+            field TEXT NOT NULL,
+            value,
+            PRIMARY KEY (category, id, field)
+        )"""
+    # rows of one category in rowid order without sorting them
+    CATEGORY_INDEX = "CREATE INDEX IF NOT EXISTS translations_category ON translations (category)"
+    # one index lookup per category instead of a scan of every row
+    CATEGORIES = """
+        WITH RECURSIVE stored(category) AS (
+            SELECT MIN(category) FROM translations
+            UNION ALL
+            SELECT (SELECT MIN(category) FROM translations WHERE category > stored.category)
+            FROM stored WHERE stored.category IS NOT NULL
+        )
+        SELECT category FROM stored WHERE category IS NOT NULL"""
+    # keeps the rowid, and so the position, of a field written before
+    UPSERT = """
+        INSERT INTO translations (category, id, field, value) VALUES (?, ?, ?, ?)
+        ON CONFLICT (category, id, field) DO UPDATE SET value = excluded.value"""
+
+    def __init__(self, file_path: str, create: bool = False):
+        """
+        :param create: create the store when file_path doesn't exist
+        :raise FileNotFoundError: file_path doesn't exist and create is False
+        """
+        if not create and not os.path.isfile(file_path):
+            # sqlite would quietly create an empty store for a mistyped path
+            raise FileNotFoundError(errno.ENOENT, "translation store not found", file_path)
+        self.file_path = file_path
+        self.connection = sqlite3.connect(file_path)
+        # every save is its own transaction, a write-ahead log keeps their commits cheap
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.connection:
+            self.connection.execute(TranslationStore.SCHEMA)
+            self.connection.execute(TranslationStore.CATEGORY_INDEX)
+
+    def close(self):
+        self.connection.close()
+
+    def translates(self) -> "StoreTranslates":
+        return StoreTranslates(self)
+
+    def categories(self) -> list[str]:
+        """
+        :return: categories of DataHolder.empty_translate, then any other category stored
+        """
+        categories = list(DataHolder.empty_translate)
+        for category, in self.connection.execute(TranslationStore.CATEGORIES):
+            if category not in DataHolder.empty_translate:
+                categories.append(category)
+        return categories
+
+    def read_category(self, category: str) -> dict:
+        """
+        :return: id -> {field: value}, or key -> value for FLAT_CATEGORIES
+        """
+        rows = self.connection.execute("SELECT id, field, value FROM translations WHERE category = ? ORDER BY rowid",
+                                       (category,))
+        if category in FLAT_CATEGORIES:
+            return {field: value for _, field, value in rows}
+        entries = {}
+        for entity_id, field, value in rows:
+            entry = entries.get(entity_id)
+            if entry is None:
+                entry = entries[entity_id] = {}
+            entry[field] = value
+        return entries
+
+    def write_entry(self, category: str, entity_id: str, fields: dict):
+        """
+        Replace the fields of one entity, only its own rows are touched.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM translations WHERE category = ? AND id = ? AND field NOT IN (%s)"
+                                    % ", ".join("?" * len(fields)), (category, entity_id, *fields))
+            self.connection.executemany(TranslationStore.UPSERT,
+                                        ((category, entity_id, field, value) for field, value in fields.items()))
+
+    def delete_entry(self, category: str, entity_id: str):
+        with self.connection:
+            self.connection.execute("DELETE FROM translations WHERE category = ? AND id = ?", (category, entity_id))
+
+    def write_category(self, category: str, entries: dict):
+        with self.connection:
+            self.connection.execute("DELETE FROM translations WHERE category = ?", (category,))
+            self.connection.executemany(TranslationStore.UPSERT, TranslationStore.__rows(category, entries))
+
+    def replace_all(self, translates: dict):
+        """
+        Replace everything stored by translates in one transaction.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM translations")
+            for category, entries in translates.items():
+                self.connection.executemany(TranslationStore.UPSERT, TranslationStore.__rows(category, entries))
+
+    def import_json(self, file_path: str):
+        """
+        Replace everything stored by the translations of a .translate file.
+        """
+        with open(file_path, "r", encoding="utf-8") as file:
+            self.replace_all(ModParser.loads_json(file.read(), file_path))
+
+    def export_json(self, file_path: str):
+        """
+        Write everything stored as a .translate file, one category in memory at a time.
+        """
+        inject.write_translates(file_path, {category: self.__category_items(category)
+                                            for category in self.categories()})
+
+    def __category_items(self, category: str):
+        yield from self.read_category(category).items()
+
+    @staticmethod
+    def __rows(category: str, entries: dict):
+        if category in FLAT_CATEGORIES:
+            return ((category, "", key, value) for key, value in entries.items())
+        return ((category, entity_id, field, value)
+                for entity_id, fields in entries.items() for field, value in fields.items())
+
+
+class StoreTranslates(MutableMapping):
+    """
+    category -> translations of a TranslationStore, shaped like DataHolder.translates.
+    Nothing is read on opening, a category is read the first time it is used. Assigning an entity or
+    a category writes its rows at once, changing a dict handed out writes nothing until it is assigned back.
+    The categories of DataHolder.empty_translate are always present, any other only while it has rows.
+    """
+
+    def __init__(self, store: TranslationStore):
+        self.store = store
+        self.__categories: dict = {}
+
+    def __getitem__(self, category):
+        group = self.__categories.get(category)
+        if group is None:
+            if category not in DataHolder.empty_translate and category not in self.store.categories():
+                raise KeyError(category)
+            if category in FLAT_CATEGORIES:
+                group = self.store.read_category(category)
+            else:
+                group = StoreCategory(self.store, category)
+            self.__categories[category] = group
+        return group
+
+    def __setitem__(self, category, entries):
+        self.store.write_category(category, entries)
+        self.__categories.pop(category, None)
+
+    def __delitem__(self, category):
+        self.store.write_category(category, {})
+        self.__categories.pop(category, None)
+
+    def __iter__(self):
+        return iter(self.store.categories())
+
+    def __len__(self):
+        return len(self.store.categories())
+
+
+class StoreCategory(MutableMapping):
+    """
+    id -> {field: value} of one category of a TranslationStore, read whole on first access.
+    """
+
+    def __init__(self, store: TranslationStore, category: str):
+        self.store = store
+        self.category = category
+        self.__entries: dict | None = None
+
+    def __getitem__(self, entity_id):
+        return self.__loaded()[entity_id]
+
+    def __setitem__(self, entity_id, fields):
+        self.store.write_entry(self.category, entity_id, fields)
+        self.__loaded()[entity_id] = fields
+
+    def __delitem__(self, entity_id):
+        entries = self.__loaded()
+        if entity_id not in entries:
+            raise KeyError(entity_id)
+        self.store.delete_entry(self.category, entity_id)
+        del entries[entity_id]
+
+    def __contains__(self, entity_id):
+        return entity_id in self.__loaded()
+
+    def __iter__(self):
+        return iter(self.__loaded())
+
+    def __len__(self):
+        return len(self.__loaded())
+
+    def get(self, entity_id, default=None):
+        return self.__loaded().get(entity_id, default)
+
+    def items(self):
+        return self.__loaded().items()
+
+    def __loaded(self) -> dict:
+        if self.__entries is None:
+            self.__entries = self.store.read_category(self.category)
+        return self.__entries
@@ -0,0 +1,605 @@
+import csv
+import io
+import os.path
+import re
+import threading
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from itertools import islice
+from operator import itemgetter
+from sys import intern
+
+import highlight
+from prototypes import *
+
+
+def data_columns(cls) -> dict[str, str]:
+    """
+    Plain csv columns of a prototype, its property_def without nested groups like desc_csv.
+    """
+    return {key: column for key, column in cls.property_def.items() if isinstance(column, str)}
+
+
+class ParseCancelled(Exception):
+    """
+    The is_cancelled callback of the running load returned True in the middle of a file.
+    """
+
+
+# rows read between two polls of is_cancelled
+CANCEL_CHECK_ROWS = 1024
+_cancel_state = threading.local()
+
+
+@contextmanager
+def cancellable(is_cancelled):
+    """
+    Rows read on this thread inside the block raise ParseCancelled once is_cancelled() returns True.
+    """
+    previous = getattr(_cancel_state, "is_cancelled", None)
+    _cancel_state.is_cancelled = is_cancelled
+    try:
+        yield
+    finally:
+        _cancel_state.is_cancelled = previous
+
+
+def _csv_reader(lines):
+    reader = csv.reader(lines)
+    is_cancelled = getattr(_cancel_state, "is_cancelled", None)
+    if is_cancelled is None:
+        return reader
+    return _polled(reader, is_cancelled)
+
+
+def _polled(reader, is_cancelled):
+    while True:
+        if is_cancelled():
+            raise ParseCancelled()
+        rows = list(islice(reader, CANCEL_CHECK_ROWS))
+        if not rows:
+            return
+        yield from rows
+
+
+def normalize_newlines(text: str) -> str:
+    """
+    \r\n and lone \r -> \n, like open() in text mode, every reader of mod files sees the same text
+    """
+    if "\r" in text:
+        return text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def read_rows(lines, key_column: str = "id") -> (list[str], iter):
+    """
+    :param lines: text lines of a csv file
+    :return: header row, iterator over the data rows with annotation and key-less rows skipped
+    """
+    reader = _csv_reader(lines)
+    headers = next(reader)
+    key_col = headers.index(key_column)
+    return headers, (row for row in reader if len(row) > key_col and row[key_col] and not row[0].startswith("#"))
+
+
+def compile_extractor(headers: list[str], columns: dict[str, str], optional: bool = False):
+    """
+    Compile a header row into a function turning one csv row into a {key: cell} dict.
+    :param headers: header row of the csv
+    :param columns: key -> column name, e.g. property_def["desc_csv"]
+    :param optional: read missing columns as "" instead of failing on the first row
+    :return: row extractor
+    """
+    keys = tuple(key for key, column in columns.items() if column in headers)
+    indexes = tuple(headers.index(columns[key]) for key in keys)
+    missing = tuple(key for key, column in columns.items() if column not in headers)
+    if missing and not optional:
+        def extract_failed(row):
+            raise ValueError("column(s) %s not found" % ", ".join(columns[key] for key in missing))
+
+        return extract_failed
+
+    if len(indexes) == 0:
+        return lambda row: dict.fromkeys(missing, "")
+    elif len(indexes) == 1 and not missing:
+        key, index = keys[0], indexes[0]
+        return lambda row: {key: row[index]}
+
+    getter = itemgetter(*indexes) if len(indexes) > 1 else lambda row: (row[indexes[0]],)
+    if missing:
+        keys += missing
+        defaults = ("",) * len(missing)
+        return lambda row: dict(zip(keys, getter(row) + defaults))
+    return lambda row: dict(zip(keys, getter(row)))
+
+
+def compile_injector(headers: list[str], columns: dict, optional: bool = False):
+    """
+    Compile a header row into a function writing the non-empty values of a translation into a csv row.
+    :param headers: header row of the csv
+    :param columns: key -> column name, or key -> ((column names), split) where split turns
+                    the translated value into one cell per column
+    :param optional: skip missing columns instead of failing
+    :return: row injector, called with (row, translation)
+    :raise ValueError: a column is missing and optional is False
+    """
+
+    def index_of(column):
+        if column in headers:
+            return headers.index(column)
+        if optional:
+            return None
+        raise ValueError("column %s not found" % column)
+
+    plain = []
+    split = []
+    for key, column in columns.items():
+        if isinstance(column, str):
+            index = index_of(column)
+            if index is not None:
+                plain.append((key, index))
+        else:
+            split.append((key, tuple(index_of(name) for name in column[0]), column[1]))
+    plain = tuple(plain)
+    split = tuple(split)
+
+    def inject(row, translation: dict):
+        for key, index in plain:
+            value = translation.get(key)
+            if value:
+                row[index] = value
+        # derived cells last, they win over a stale plain value of the same column
+        for key, indexes, split_value in split:
+            value = translation.get(key)
+            if value:
+                for index, cell in zip(indexes, split_value(value)):
+                    if index is not None:
+                        row[index] = cell
+
+    return inject
+
+
+def inject_rows(lines, writer, compile_targets, key_column: str = "id", group_column: str | None = None):
+    """
+    Stream a csv to writer once, rows with a translation go through their injector on the way.
+    :param lines: text lines of the source csv
+    :param writer: csv writer of the translated copy
+    :param compile_targets: called with the header row, returns group -> (id -> translation, injector);
+                            without group_column every row belongs to the group None
+    :param group_column: column splitting the rows into groups, e.g. "type" of descriptions.csv
+    """
+    reader = csv.reader(lines)
+    headers = next(reader)
+    writer.writerow(headers)
+    key_col = headers.index(key_column)
+    targets = compile_targets(headers)
+
+    if group_column is None:
+        translations, inject = targets.get(None, ({}, None))
+
+        def translated_rows():
+            for row in reader:
+                # skip empty rows and annotation rows
+                if len(row) > key_col and row[key_col] and not row[0].startswith("#"):
+                    translation = translations.get(row[key_col])
+                    if translation:
+                        inject(row, translation)
+                yield row
+    else:
+        group_col = headers.index(group_column)
+        min_len = max(key_col, group_col) + 1
+
+        def translated_rows():
+            for row in reader:
+                if len(row) >= min_len and row[key_col] and not row[0].startswith("#"):
+                    target = targets.get(row[group_col])
+                    if target is not None:
+                        translation = target[0].get(row[key_col])
+                        if translation:
+                            target[1](row, translation)
+                yield row
+
+    # writerows keeps the per-row write loop in C
+    writer.writerows(translated_rows())
+
+
+# one record of hand written or csv.writer output: quoted cells with "" escapes or bare cells,
+# a stray quote or text after a closing quote makes the record not match
+_CELL = rb'(?:"[^"]*(?:""[^"]*)*"|[^,"\r\n]*)'
+_record_pattern = re.compile(rb"%s(?:,%s)*(?:\r\n|\n|\r|\Z)" % (_CELL, _CELL))
+# a cell and the separator or line break after it
+_cell_pattern = re.compile(rb"(%s)(?:,|\r\n|\n|\r|\Z)" % _CELL)
+
+
+def quote_cell(value: str) -> str:
+    """
+    Quote a cell the way csv.writer does by default, only when it holds a separator, quote or line break.
+    """
+    if "," in value or '"' in value or "\n" in value or "\r" in value:
+        return '"%s"' % value.replace('"', '""')
+    return value
+
+
+def splice_rows(data, compile_targets, key_column: str = "id", group_column: str | None = None,
+                start: int = 0) -> list[bytes] | None:
+    """
+    Byte level counterpart of inject_rows for utf-8 csv files.
+    Only cells a translation changes are encoded again, every other byte of data is copied as it is,
+    quoting and line breaks included, so the translated file diffs against the original cell by cell.
+    :param data: bytes of the csv, e.g. a mmap of it
+    :param compile_targets: see inject_rows
+    :param start: offset of the header row, past a bom
+    :return: chunks of the translated csv,
+             None when data holds records only csv.reader takes apart, write those with inject_rows
+    """
+    # csv.reader decides what the cells are, the record pattern only tells where they are
+    reader = csv.reader(io.StringIO(data[start:].decode("utf-8"), newline=""))
+    headers = next(reader, None)
+    record = _record_pattern.match(data, start)
+    if headers is None or record is None:
+        return None
+    key_col = headers.index(key_column)
+    group_col = headers.index(group_column) if group_column is not None else None
+    min_len = max(key_col, group_col or 0) + 1
+    targets = compile_targets(headers)
+    if not targets:
+        return [data[:]]
+
+    chunks = []
+    copied = 0
+    pos = record.end()
+    end = len(data)
+    match_record = _record_pattern.match
+    find_cells = _cell_pattern.finditer
+    for row in reader:
+        record = match_record(data, pos) if pos < end else None
+        if record is None:
+            return None
+        pos = record.end()
+        # skip empty rows and annotation rows
+        if len(row) < min_len or not row[key_col] or row[0].startswith("#"):
+            continue
+        target = targets.get(None if group_col is None else row[group_col])
+        translation = target[0].get(row[key_col]) if target is not None else None
+        if not translation:
+            continue
+        translated = row.copy()
+        target[1](translated, translation)
+        if translated == row:
+            continue
+        # the first len(row) matches inside the record are its cells
+        spans = [cell.span(1) for cell in islice(find_cells(data, record.start(), pos), len(row))]
+        if len(spans) != len(row):
+            return None
+        for (cell_start, cell_end), old, new in zip(spans, row, translated):
+            # translations come from normalized text, a crlf cell equal to its translation is kept
+            if old != new and normalize_newlines(old) != new:
+                chunks.append(data[copied:cell_start])
+                chunks.append(quote_cell(new).encode("utf-8"))
+                copied = cell_end
+    if pos != end:
+        return None
+    chunks.append(data[copied:])
+    return chunks
+
+
+def index_rows(data, encoding: str = "utf-8", key_column: str = "id", group_column: str | None = None,
+               start: int = 0) -> tuple[list[str], dict, array] | None:
+    """
+    Locate the record of every row in one scan, rows are told apart like read_rows does.
+    :param data: bytes of the csv in an ascii compatible encoding
+    :param start: offset of the header row, past a bom
+    :return: header row, key -> offset of its record in data (group -> key -> offset with group_column),
+             offset of every record after the header row followed by the end of data, see record_span;
+             None when data holds records only csv.reader takes apart, see splice_rows
+    """
+    reader = _csv_reader(io.StringIO(data[start:].decode(encoding), newline=""))
+    headers = next(reader, None)
+    record = _record_pattern.match(data, start)
+    if headers is None or record is None:
+        return None
+    key_col = headers.index(key_column)
+    group_col = headers.index(group_column) if group_column is not None else None
+    min_len = max(key_col, group_col or 0) + 1
+
+    # one int per row, the index of a big mod stays a fraction of its parsed entities
+    offsets = {}
+    bounds = array("q")
+    pos = record.end()
+    end = len(data)
+    match_record = _record_pattern.match
+    for row in reader:
+        record = match_record(data, pos) if pos < end else None
+        if record is None:
+            return None
+        bounds.append(pos)
+        if len(row) >= min_len and row[key_col] and not row[0].startswith("#"):
+            if group_col is None:
+                offsets[row[key_col]] = pos
+            else:
+                offsets.setdefault(row[group_col], {})[row[key_col]] = pos
+        pos = record.end()
+    if pos != end:
+        return None
+    bounds.append(end)
+    return headers, offsets, bounds
+
+
+def record_span(bounds: array, offset: int) -> tuple[int, int]:
+    """
+    :param bounds: record offsets of index_rows
+    :param offset: offset of a record
+    :return: offset, length of the record
+    """
+    return offset, bounds[bisect_left(bounds, offset) + 1] - offset
+
+
+def read_record(data: bytes, encoding: str = "utf-8") -> list[str]:
+    """
+    :param data: bytes of one record located by index_rows
+    :return: cells of the record, line breaks inside them normalized like ModParser.read_text does
+    """
+    return next(csv.reader(io.StringIO(normalize_newlines(data.decode(encoding)), newline="")), [])
+
+
+def compiled(cache: dict, headers: list[str], what, compile_layout):
+    """
+    Memoize what a table compiles from a header row, parse and apply of a file share one layout.
+    :param cache: per table, keyed by (what, header row)
+    :param what: name of the compiled function, e.g. "builder" or ("injector", "SHIP")
+    :param compile_layout: called with the header row on a miss
+    """
+    key = (what, tuple(headers))
+    result = cache.get(key)
+    if result is None:
+        result = cache[key] = compile_layout(headers)
+    return result
+
+
+class EntityTable:
+    """
+    One entity csv of a mod, declared on top of the property_def of its prototype.
+    The header row is compiled once per file into a row -> entity builder and a row injector,
+    so parse and apply of every table run the same loop.
+    """
+
+    def __init__(self, kind: str, entity_cls, file_path: str, init: tuple[str, ...],
+                 converters: dict | None = None, splits: dict | None = None, read_only: tuple[str, ...] = ("id",)):
+        """
+        :param kind: translate category and parse cache kind, e.g. "WEAPON"
+        :param entity_cls: prototype, its plain property_def entries are the columns of the table
+        :param file_path: relative to the mod root
+        :param init: keys passed to entity_cls() in order, the other columns are set as attributes
+        :param converters: key -> function applied to the cell before it reaches the entity
+        :param splits: key -> ((column names), split) for translated values spread over several cells
+        :param read_only: keys never written back by apply
+        """
+        self.kind = kind
+        self.entity_cls = entity_cls
+        self.file_path = file_path
+        self.columns = data_columns(entity_cls)
+        self.init = init
+        self.converters = converters or {}
+        self.translate_columns = {key: column for key, column in self.columns.items() if key not in read_only}
+        self.translate_columns.update(splits or {})
+        # (what, header row) -> compiled function, see compiled()
+        self.layouts = {}
+
+    def compile_builder(self, headers: list[str]):
+        """
+        :return: function turning one csv row into an entity
+        :raise ValueError: a column is missing
+        """
+        missing = [column for column in self.columns.values() if column not in headers]
+        if missing:
+            raise ValueError("column(s) %s not found" % ", ".join(missing))
+        keys = self.init + tuple(key for key in self.columns if key not in self.init)
+        plan = tuple((headers.index(self.columns[key]), self.converters.get(key)) for key in keys)
+        attributes = keys[len(self.init):]
+        init_count = len(self.init)
+        entity_cls = self.entity_cls
+
+        def build(row):
+            cells = [row[index] if convert is None else convert(row[index]) for index, convert in plan]
+            entity = entity_cls(*cells[:init_count])
+            for key, value in zip(attributes, cells[init_count:]):
+                setattr(entity, key, value)
+            return entity
+
+        return build
+
+    def parse(self, lines) -> dict:
+        """
+        :param lines: text lines of the csv
+        :return: id -> entity, in file order
+        :raise ValueError: a column is missing
+        """
+        headers, rows = read_rows(lines)
+        build = compiled(self.layouts, headers, "builder", self.compile_builder)
+        id_col = headers.index(self.columns["id"])
+        return {row[id_col]: build(row) for row in rows}
+
+    def index(self, data, encoding: str = "utf-8", start: int = 0) -> tuple[list[str], dict, array] | None:
+        """
+        :return: header row, id -> offset of its record, record offsets, see index_rows
+        """
+        return index_rows(data, encoding, key_column=self.columns["id"], start=start)
+
+    def build(self, headers: list[str], row: list[str]):
+        """
+        Turn one row of a csv with the given header row into an entity.
+        :raise ValueError: a column is missing
+        """
+        return compiled(self.layouts, headers, "builder", self.compile_builder)(row)
+
+    def used_translations(self, translates: dict) -> dict:
+        """
+        :return: id -> (value of every translate column), the part of translates inject() reads
+        """
+        keys = tuple(self.translate_columns)
+        return {entity_id: tuple(map(translation.get, keys))
+                for entity_id, translation in (translates.get(self.kind) or {}).items() if translation}
+
+    def inject(self, lines, writer, translates: dict):
+        """
+        Write the csv to writer with the translations of self.kind applied.
+        :raise ValueError: a translated column is missing
+        """
+        inject_rows(lines, writer, self._compile_targets(translates), key_column=self.columns["id"])
+
+    def splice(self, data, translates: dict, start: int = 0) -> list[bytes] | None:
+        """
+        inject() for the bytes of a utf-8 csv, see splice_rows.
+        :raise ValueError: a translated column is missing
+        """
+        return splice_rows(data, self._compile_targets(translates), key_column=self.columns["id"], start=start)
+
+    def _compile_targets(self, translates: dict):
+        translations = translates.get(self.kind)
+
+        def compile_targets(headers):
+            if not translations:
+                return {}
+            return {None: (translations, compiled(self.layouts, headers, "injector",
+                                                  lambda headers: compile_injector(headers, self.translate_columns)))}
+
+        return compile_targets
+
+
+class DescriptionTable:
+    """
+    descriptions.csv, rows of every description group keyed by (type, id).
+    Each group maps text columns through the desc_csv of its prototype.
+    """
+    kind = "DESCRIPTIONS"
+    file_path = os.path.join("data", "strings", "descriptions.csv")
+
+    def __init__(self, groups: dict[str, tuple[dict, bool]], splits: dict[str, dict] | None = None,
+                 read_only: dict[str, tuple] | None = None):
+        """
+        :param groups: type -> (key -> text column, whether the columns are optional)
+        :param splits: type -> {key: ((column names), split)} for translated values spread over several cells
+        :param read_only: type -> keys never written back by apply
+        """
+        self.groups = groups
+        self.translate_columns = {}
+        for type_str, (columns, _) in groups.items():
+            skipped = (read_only or {}).get(type_str, ())
+            translate_columns = {key: column for key, column in columns.items() if key not in skipped}
+            translate_columns.update((splits or {}).get(type_str, {}))
+            self.translate_columns[type_str] = translate_columns
+        # (what, header row) -> compiled function, see compiled()
+        self.layouts = {}
+
+    def parse(self, lines) -> dict:
+        """
+        :return: type -> id -> {key: text}, every group present even when empty
+        """
+        result = {type_str: {} for type_str in self.groups}
+        headers, rows = read_rows(lines)
+        id_col = headers.index("id")
+        type_col = headers.index("type")
+        # resolve columns once per file, not once per cell
+        targets = {type_str: (result[type_str],
+                              compiled(self.layouts, headers, ("extractor", type_str),
+                                       lambda headers: compile_extractor(headers, columns, optional)))
+                   for type_str, (columns, optional) in self.groups.items()}
+        for row in rows:
+            # sort by type
+            target = targets.get(row[type_col])
+            if target is not None:
+                target[0][row[id_col]] = target[1](row)
+        return result
+
+    def index(self, data, encoding: str = "utf-8", start: int = 0) -> tuple[list[str], dict, array] | None:
+        """
+        :return: header row, type -> id -> offset of its record, record offsets, see index_rows
+        """
+        return index_rows(data, encoding, group_column="type", start=start)
+
+    def extract(self, headers: list[str], row: list[str]) -> dict | None:
+        """
+        :return: {key: text} of one row of a descriptions.csv with the given header row,
+                 None for a type without group
+        """
+        type_str = row[headers.index("type")]
+        group = self.groups.get(type_str)
+        if group is None:
+            return None
+        return compiled(self.layouts, headers, ("extractor", type_str),
+                        lambda headers: compile_extractor(headers, *group))(row)
+
+    def used_translations(self, translates: dict) -> dict:
+        """
+        :return: type -> id -> (value of every translate column), the part of translates inject() reads
+        """
+        result = {}
+        for type_str, columns in self.translate_columns.items():
+            keys = tuple(columns)
+            result[type_str] = {entity_id: tuple(map(translation.get, keys))
+                                for entity_id, translation in (translates.get(type_str) or {}).items() if translation}
+        return result
+
+    def inject(self, lines, writer, translates: dict):
+        """
+        Write descriptions.csv to writer with the translations of every group applied.
+        """
+        inject_rows(lines, writer, self._compile_targets(translates), group_column="type")
+
+    def splice(self, data, translates: dict, start: int = 0) -> list[bytes] | None:
+        """
+        inject() for the bytes of a utf-8 descriptions.csv, see splice_rows.
+        """
+        return splice_rows(data, self._compile_targets(translates), group_column="type", start=start)
+
+    def _compile_targets(self, translates: dict):
+        def compile_targets(headers):
+            targets = {}
+            for type_str, columns in self.translate_columns.items():
+                translations = translates.get(type_str)
+                if translations:
+                    optional = self.groups[type_str][1]
+                    targets[type_str] = (translations,
+                                         compiled(self.layouts, headers, ("injector", type_str),
+                                                  lambda headers: compile_injector(headers, columns, optional)))
+            return targets
+
+        return compile_targets
+
+
+# the game csv files this tool reads and writes, kind -> table
+ENTITY_TABLES = {
+    "SHIP": EntityTable("SHIP", ShipHull, os.path.join("data", "hulls", "ship_data.csv"),
+                        init=("id", "name", "role", "tech"),
+                        # role and manufacturer repeat across hulls, share one string each
+                        converters={"role": intern, "tech": intern}),
+    "WEAPON": EntityTable("WEAPON", Weapon, os.path.join("data", "weapons", "weapon_data.csv"),
+                          init=("id", "is_system_weapon", "name", "tech", "role"),
+                          # low-cardinality columns are interned, thousands of weapons share a few strings
+                          converters={"is_system_weapon": lambda hints: "SYSTEM" in hints,
+                                      "tech": intern, "role": intern, "fly_speed": intern,
+                                      "tracking": intern, "accuracy": intern, "turn_rate": intern},
+                          splits={"special_effect_1": (("customPrimary", "customPrimaryHL"),
+                                                       highlight.encode_percent),
+                                  "special_effect_2": (("customAncillary", "customAncillaryHL"),
+                                                       highlight.encode_percent)},
+                          read_only=("id", "is_system_weapon", "special_effect_1_hl", "special_effect_2_hl")),
+    "SHIP_SYSTEM": EntityTable("SHIP_SYSTEM", ShipSystem, os.path.join("data", "shipsystems", "ship_systems.csv"),
+                               init=("id", "name")),
+    "HULLMOD": EntityTable("HULLMOD", HullMod, os.path.join("data", "hullmods", "hull_mods.csv"),
+                           init=("id",)),
+}
+
+DESCRIPTION_TABLE = DescriptionTable(
+    groups={
+        "SHIP": (ShipHull.property_def["desc_csv"], False),
+        "WEAPON": (Weapon.property_def["desc_csv"], False),
+        "SHIP_SYSTEM": (ShipSystem.property_def["desc_csv"], True),
+        "FACTION": (Faction.property_def["desc_csv"], False),
+        "RESOURCE": (Resource.property_def["desc_csv"], False),
+        "CUSTOM": ({"description": "text1", "market_desc": "text3"}, False),
+    },
+    splits={"SHIP_SYSTEM": {"desc_on_ship": (("text3", "text4"), highlight.encode_inline)}},
+    read_only={"SHIP_SYSTEM": ("highlights",)},
+)
@@ -0,0 +1,42 @@
+"""
+Cost of turning descriptions.csv rows into description dicts, on top of csv.reader itself.
+Run from the repository root with PYTHONPATH=. python tests/bench_descriptions.py [rows].
+The file is read once, only parsing is timed, best of 25 runs of process_time.
+"""
+import csv
+import gc
+import io
+import os
+import sys
+import tempfile
+import time
+
+from parse import ModParser
+from synthetic_mod import write_mod
+from table import DESCRIPTION_TABLE
+
+
+def _best(function, runs: int = 25) -> float:
+    best = None
+    for _ in range(runs):
+        start = time.process_time()
+        function()
+        seconds = time.process_time() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    with tempfile.TemporaryDirectory() as mod_path:
+        write_mod(mod_path, descriptions=rows)
+        text = ModParser.read_text(os.path.join(mod_path, DESCRIPTION_TABLE.file_path))
+    gc.disable()
+    reader = _best(lambda: list(csv.reader(io.StringIO(text))))
+    parse = _best(lambda: DESCRIPTION_TABLE.parse(io.StringIO(text)))
+    print("%d rows: csv.reader %.1fms, parse %.1fms, extraction %.1fms"
+          % (rows, reader * 1e3, parse * 1e3, (parse - reader) * 1e3))
+
+
+if __name__ == "__main__":
+    main()
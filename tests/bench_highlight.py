@@ -0,0 +1,94 @@
+"""
+Timings of the highlight codec, run from the repository root with
+PYTHONPATH=. python tests/bench_highlight.py [mod path].
+Without a mod path the strings are generated: short ones like weapon descriptions, a fifth of them without
+highlights, and long ones with 400 highlights. The str.replace column is the chain the codec replaced.
+"""
+import random
+import sys
+import time
+
+import highlight
+
+
+def _generated(seed: int = 21, count: int = 5000):
+    rnd = random.Random(seed)
+    words = ["Deals", "damage", "for", "seconds", "speed", "armor", "shield", "flux", "range", "to"]
+    percent, inline = [], []
+    for _ in range(count):
+        numbers = ["%d%%" % rnd.randint(1, 100) for _ in range(rnd.randint(0, 4))]
+        sentence = [rnd.choice(words) for _ in range(rnd.randint(5, 25))]
+        for number in numbers:
+            sentence.insert(rnd.randint(0, len(sentence)), number)
+        highlights = highlight.SEPARATOR.join(numbers)
+        inline.append((" ".join(sentence), highlights))
+        percent.append((" ".join("%s" if word in numbers else word for word in sentence), highlights))
+    return percent, inline
+
+
+def _mod(mod_path: str):
+    from loader import ModLoader
+    data = ModLoader().parse(mod_path, ["weapons", "ship_systems"])
+    percent = [(weapon.special_effect_1, weapon.special_effect_1_hl) for weapon in data["weapons"].values()] + \
+              [(weapon.special_effect_2, weapon.special_effect_2_hl) for weapon in data["weapons"].values()]
+    inline = [(system.desc_on_ship, system.highlights) for system in data["ship_systems"].values()]
+    return percent, inline
+
+
+def _replace_percent(text: str, highlights: str) -> str:
+    # the str.replace chain the codec replaced, the baseline for short strings
+    if not highlights:
+        return text
+    for word in highlights.split("|"):
+        text = text.replace("%s", "{{" + word + "}}", 1)
+    return text
+
+
+def _replace_inline(text: str, highlights: str) -> str:
+    if not highlights:
+        return text
+    for word in highlights.split("|"):
+        text = text.replace(word, "%#s#%", 1)
+    for word in highlights.split("|"):
+        text = text.replace("%#s#%", "{{" + word + "}}", 1)
+    return text
+
+
+def _time(function, items, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text, highlights in items:
+            function(text, highlights)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main():
+    percent, inline = _mod(sys.argv[1]) if len(sys.argv) > 1 else _generated()
+    # most fields of a mod hold no highlight, those have to stay as cheap as the replace chain
+    plain_percent = [(text, highlights) for text, highlights in percent if not highlights or "%s" not in text]
+    plain_inline = [(text, highlights) for text, highlights in inline if not highlights]
+    percent = [(text, highlights) for text, highlights in percent if highlights and "%s" in text]
+    inline = [(text, highlights) for text, highlights in inline if highlights]
+    long_percent = [("x %s " * 400, highlight.SEPARATOR.join(str(i) for i in range(400)))]
+    long_inline = [(" ".join("w%d" % i for i in range(400)),
+                    highlight.SEPARATOR.join("w%d" % i for i in range(0, 400, 2)))]
+    print("%-15s %7s %10s %12s" % ("", "strings", "codec", "str.replace"))
+    for name, function, baseline, items, repeat in [
+        ("percent plain", highlight.decode_percent, _replace_percent, plain_percent, 5),
+        ("percent decode", highlight.decode_percent, _replace_percent, percent, 5),
+        ("percent render", lambda text, hl: highlight.render_percent(text, hl, "red"), None, percent, 5),
+        ("inline plain", highlight.decode_inline, _replace_inline, plain_inline, 5),
+        ("inline decode", highlight.decode_inline, _replace_inline, inline, 5),
+        ("inline render", lambda text, hl: highlight.render_inline(text, hl, "red"), None, inline, 5),
+        ("long percent", highlight.decode_percent, _replace_percent, long_percent, 20),
+        ("long inline", highlight.decode_inline, _replace_inline, long_inline, 20),
+    ]:
+        reference = "%10.3fms" % (_time(baseline, items, repeat) * 1e3) if baseline is not None else ""
+        print("%-15s %7d %8.3fms %12s" % (name, len(items), _time(function, items, repeat) * 1e3, reference))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Memory retained by the entities of several large mods loaded at once, measured with tracemalloc.
+Run from the repository root with PYTHONPATH=. python tests/bench_memory.py [mods].
+Each mod has 20k description rows, 5k weapons, 2k hulls, 500 systems and 300 hullmods, the parse cache is off.
+"""
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from loader import ModLoader
+from parse import ModParser
+from synthetic_mod import write_mod
+
+
+def main():
+    mods = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    ModParser.cache = None
+    with tempfile.TemporaryDirectory() as root:
+        mod_paths = []
+        for i in range(mods):
+            mod_paths.append(os.path.join(root, "mod_%d" % i))
+            write_mod(mod_paths[-1], descriptions=20000, seed=i)
+        tracemalloc.start()
+        data_holders = [ModLoader().load(mod_path) for mod_path in mod_paths]
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+        # the entities keep their description texts, only the parsed descriptions.csv itself is dropped
+        for data_holder in data_holders:
+            data_holder.descriptions = None
+        gc.collect()
+        entities = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    print("%d mods: %.1f MB retained (%.1f MB peak), entities %.1f MB"
+          % (mods, retained / 2 ** 20, peak / 2 ** 20, entities / 2 ** 20))
+
+
+if __name__ == "__main__":
+    main()
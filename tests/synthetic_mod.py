@@ -0,0 +1,61 @@
+"""
+Synthetic mods for the benchmark scripts of this directory, every data file the parser reads filled with
+generated rows in the shape of a large faction mod.
+"""
+import csv
+import io
+import os
+import random
+
+WEAPON_HEADERS = ["name", "id", "tier", "range", "damage/shot", "hints", "tags", "tech/manufacturer",
+                  "for weapon tooltip>>", "primaryRoleStr", "speedStr", "trackingStr", "turnRateStr", "accuracyStr",
+                  "customPrimary", "customPrimaryHL", "customAncillary", "customAncillaryHL", "number"]
+TECHS = ["Low Tech", "Midline", "High Tech", "Pirate", "Common"]
+ROLES = ["Strike", "Point Defense", "Support", "Anti Armor", "General"]
+
+
+def write_mod(mod_path: str, descriptions: int = 50000, weapons: int = 5000, hulls: int = 2000,
+              systems: int = 500, hullmods: int = 300, seed: int = 1):
+    """
+    :param descriptions: rows of descriptions.csv, at least one per weapon, hull and system
+    """
+    rnd = random.Random(seed)
+    files = {}
+    rows = [WEAPON_HEADERS]
+    for i in range(weapons):
+        rows.append(["Gun %d" % i, "gun_%d" % i, "1", "700", "100", "PD", "tag", rnd.choice(TECHS), "",
+                     rnd.choice(ROLES), "Fast", "Good", "Very High", "High",
+                     "Deals %s extra damage for %s seconds" if i % 3 == 0 else "", "20% | 3" if i % 3 == 0 else "",
+                     "Ancillary %s" if i % 5 == 0 else "", "x" if i % 5 == 0 else "", str(i)])
+    files[os.path.join("data", "weapons", "weapon_data.csv")] = rows
+    rows = [["name", "id", "designation", "tech/manufacturer", "system id", "fleet pts", "hitpoints"]]
+    for i in range(hulls):
+        rows.append(["Hull %d" % i, "hull_%d" % i, rnd.choice(["Frigate", "Destroyer", "Cruiser"]), rnd.choice(TECHS),
+                     "sys_%d" % (i % systems), "5", "1000"])
+    files[os.path.join("data", "hulls", "ship_data.csv")] = rows
+    rows = [["name", "id", "flux/second", "flux/use", "cr/use"]]
+    rows += [["System %d" % i, "sys_%d" % i, "1", "2", "0"] for i in range(systems)]
+    files[os.path.join("data", "shipsystems", "ship_systems.csv")] = rows
+    rows = [["name", "id", "tier", "rarity", "tech/manufacturer", "tags", "script", "desc", "short", "sprite"]]
+    rows += [["Mod %d" % i, "hm_%d" % i, "1", "1", "Common", "", "x.y", "Increases %%s by %d%%" % i, "short", "s.png"]
+             for i in range(hullmods)]
+    files[os.path.join("data", "hullmods", "hull_mods.csv")] = rows
+    rows = [["id", "type", "text1", "text2", "text3", "text4", "notes"]]
+    rows += [["gun_%d" % i, "WEAPON", 'A long, "quoted" description of gun %d\nwith two lines' % i, "Foot note",
+              "", "", ""] for i in range(weapons)]
+    rows += [["hull_%d" % i, "SHIP", "Long desc %d" % i, "short", "fleet", "", ""] for i in range(hulls)]
+    rows += [["sys_%d" % i, "SHIP_SYSTEM", "Codex %d" % i, "Type", "Raises speed by 50% for 3 seconds",
+              "50%|3 seconds", ""] for i in range(systems)]
+    rows += [["res_%d" % i, rnd.choice(["RESOURCE", "FACTION", "CUSTOM"]), "text %d" % i, "", "m", "", ""]
+             for i in range(len(rows) - 1, descriptions)]
+    files[os.path.join("data", "strings", "descriptions.csv")] = rows
+
+    for path, rows in files.items():
+        path = os.path.join(mod_path, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\r\n").writerows(rows)
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            file.write(buffer.getvalue())
+    with open(os.path.join(mod_path, "mod_info.json"), "w", encoding="utf-8") as file:
+        file.write('{"id": "bench_mod", "name": "Bench Mod", "version": "1.0", "gameVersion": "0.97a"}')
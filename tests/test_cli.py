@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import cli
+
+
+def _apply_or_die(mod_path, file_path, force):
+    if os.path.basename(mod_path) == "crash":
+        os._exit(1)
+    # still running or queued when the crash breaks the pool
+    time.sleep(0.2)
+    return []
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork",
+                    reason="workers only see the patched apply_translates when forked")
+def test_batch_apply_survives_dead_worker(monkeypatch):
+    monkeypatch.setattr(cli, "apply_translates", _apply_or_die)
+    jobs = [("mod_%d" % i, os.path.join("mods", "crash" if i == 3 else "mod_%d" % i), "t.translate")
+            for i in range(7)]
+
+    results = cli.batch_apply(jobs, max_workers=2)
+
+    assert [result[0] for result in results] == [job[0] for job in jobs]
+    for mod_id, error, skipped, _ in results:
+        if mod_id == "mod_3":
+            assert error is not None and "BrokenProcessPool" in error
+        else:
+            assert error is None and skipped == 0
+
+
+@pytest.fixture
+def weapons_only_mod(tmp_path):
+    mod_path = str(tmp_path / "mod")
+    os.makedirs(os.path.join(mod_path, "data", "weapons"))
+    with open(os.path.join(mod_path, "data", "weapons", "weapon_data.csv"), "w", encoding="utf-8") as file:
+        file.write("name,id\nGun,gun\n")
+    translate_file = str(tmp_path / "mod.translate")
+    with open(translate_file, "w", encoding="utf-8") as file:
+        file.write('{"WEAPON": {"gun": {"name": "枪"}}}')
+    return mod_path, translate_file
+
+
+def test_coverage_of_mod_without_some_csv_files(weapons_only_mod, capsys):
+    mod_path, translate_file = weapons_only_mod
+
+    assert cli.main(["--no-cache", "coverage", mod_path, translate_file]) == 0
+    out = capsys.readouterr().out
+    assert "file missing" in out and "100.0%" in out
+    assert cli.main(["--no-cache", "coverage", "--strict", mod_path, translate_file]) == 1
+
+
+def test_coverage_of_missing_translate_file(weapons_only_mod, capsys):
+    mod_path, translate_file = weapons_only_mod
+
+    assert cli.main(["--no-cache", "coverage", mod_path, translate_file + "_missing"]) == 1
+    assert "coverage failed" in capsys.readouterr().err
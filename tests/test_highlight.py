@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+import highlight
+
+WORDS = ["Deals", "damage", "for", "seconds", "20%", "3", "x", "speed", "a,b", "50%", "2x", "-", "s", "3 s", "armor",
+         "%", "护盾", "{", "}"]
+
+
+def _markups(seed: int, count: int = 2000):
+    """
+    Random markup, each highlighted word not appearing as plain text before it.
+    """
+    rnd = random.Random(seed)
+    for _ in range(count):
+        parts = []
+        plain = ""
+        for _ in range(rnd.randint(0, 12)):
+            word = rnd.choice(WORDS)
+            if rnd.random() < 0.3 and word not in plain and word not in "{}":
+                parts.append("{{" + word + "}}")
+            else:
+                parts.append(word)
+                plain += " " + word
+        yield " ".join(parts)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_percent_round_trip(seed):
+    for markup in _markups(seed):
+        text, highlights = highlight.encode_percent(markup)
+        assert highlight.decode_percent(text, highlights) == markup
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_inline_round_trip(seed):
+    for markup in _markups(seed):
+        text, highlights = highlight.encode_inline(markup)
+        assert highlight.decode_inline(text, highlights) == markup
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_game_forms_stable(seed):
+    rnd = random.Random(seed)
+    for markup in _markups(seed):
+        text, highlights = highlight.encode_percent(markup)
+        assert highlight.encode_percent(highlight.decode_percent(text, highlights)) == (text, highlights)
+        # highlights of game files are not always in text order
+        words = highlight.split_highlights(highlights)
+        rnd.shuffle(words)
+        text, highlights = highlight.encode_inline(markup)
+        shuffled = highlight.SEPARATOR.join(words)
+        decoded = highlight.decode_inline(text, shuffled)
+        assert highlight.encode_inline(decoded)[0] == text
+
+
+def test_documented_forms():
+    assert highlight.encode_percent("Deals {{20%}} damage for {{3}} seconds") == \
+        ("Deals %s damage for %s seconds", "20% | 3")
+    assert highlight.decode_percent("Deals %s damage for %s seconds", "20% | 3") == \
+        "Deals {{20%}} damage for {{3}} seconds"
+    assert highlight.encode_inline("Boosts speed by {{50%}} for {{3 s}}") == \
+        ("Boosts speed by 50% for 3 s", "50% | 3 s")
+    assert highlight.decode_inline("Boosts speed by 50% for 3 s", "50% | 3 s") == \
+        "Boosts speed by {{50%}} for {{3 s}}"
+    assert highlight.render_percent("a %s c", "b", "red") == "a <font color=red>b</font> c"
+    # placeholders without highlight stay, highlights not in the text are dropped
+    assert highlight.decode_percent("a %s %s", "b") == "a {{b}} %s"
+    assert highlight.decode_inline("a b c", "z | b") == "a {{b}} c"
@@ -0,0 +1,128 @@
+import json
+import os
+
+import pytest
+
+import cli
+import inject
+from parse import ModParser
+from prototypes import DataHolder
+
+WEAPON_HEADERS = ["name", "id", "tier", "range", "damage/shot", "hints", "tags", "tech/manufacturer",
+                  "for weapon tooltip>>", "primaryRoleStr", "speedStr", "trackingStr", "turnRateStr", "accuracyStr",
+                  "customPrimary", "customPrimaryHL", "customAncillary", "customAncillaryHL", "number"]
+TRANSLATES = {
+    "WEAPON": {"gun": {"name": "枪"}},
+    "MOD_META": {"name": "模组", "description": "描述"},
+}
+
+
+class Crash(BaseException):
+    """
+    The process dying, nothing after it runs.
+    """
+
+
+@pytest.fixture
+def mod(tmp_path, monkeypatch):
+    """
+    :return: mod path, relative path -> bytes of every file apply_translation writes
+    """
+    monkeypatch.setattr(ModParser, "cache", None)
+    mod_path = str(tmp_path / "mod")
+    files = {
+        os.path.join("data", "strings", "descriptions.csv"): b"id,type,text1,text2,text3,text4,notes\r\n"
+                                                             b"gun,WEAPON,gun text,,,,\r\n",
+        os.path.join("data", "weapons", "weapon_data.csv"):
+            (",".join(WEAPON_HEADERS) + "\r\nGun,gun,1,500,10,,,Common,,,,,,,,,,,1\r\n").encode(),
+        os.path.join("data", "shipsystems", "ship_systems.csv"): b"name,id\r\nBurn,burn\r\n",
+        os.path.join("data", "hulls", "ship_data.csv"): b"name,id\r\nHull,hull\r\n",
+        "mod_info.json": b'{"id": "mod", "name": "Mod", "description": "A mod", "gameVersion": "0.97a"}',
+    }
+    for path, data in files.items():
+        os.makedirs(os.path.dirname(os.path.join(mod_path, path)), exist_ok=True)
+        with open(os.path.join(mod_path, path), "wb") as file:
+            file.write(data)
+    return mod_path, files
+
+
+def _data_holder(mod_path) -> DataHolder:
+    data_holder = DataHolder(mod_path=mod_path)
+    data_holder.translates = TRANSLATES
+    return data_holder
+
+
+def _assert_untouched(mod_path, files):
+    for path, data in files.items():
+        with open(os.path.join(mod_path, path), "rb") as file:
+            assert file.read() == data, path
+        assert not os.path.exists(os.path.join(mod_path, path) + "_new"), path
+    assert not os.path.exists(os.path.join(mod_path, "translate", "apply.pending"))
+
+
+def _fail_on_call(monkeypatch, error, call: int):
+    replace = os.replace
+    calls = []
+
+    def failing_replace(source, target):
+        calls.append(source)
+        if len(calls) == call:
+            raise error
+        replace(source, target)
+
+    monkeypatch.setattr(inject.os, "replace", failing_replace)
+
+
+def test_apply_translates_the_mod(mod):
+    mod_path, files = mod
+    inject.apply_translation(_data_holder(mod_path))
+
+    weapons = ModParser.parse_entities(mod_path, "WEAPON")
+    assert weapons["gun"].name == "枪"
+    with open(os.path.join(mod_path, "mod_info.json"), "r", encoding="utf-8") as file:
+        assert json.load(file)["name"] == "模组"
+
+
+def test_failed_rename_rolls_back_replaced_files(mod, monkeypatch):
+    mod_path, files = mod
+    # the first target is already swapped, the second one moved aside
+    _fail_on_call(monkeypatch, OSError("disk full"), 4)
+
+    with pytest.raises(OSError):
+        inject.apply_translation(_data_holder(mod_path))
+
+    monkeypatch.undo()
+    _assert_untouched(mod_path, files)
+
+
+@pytest.mark.parametrize("call", [1, 2, 3, 4, 9, 10])
+def test_crash_is_rolled_back_before_the_next_read(mod, monkeypatch, call):
+    mod_path, files = mod
+    _fail_on_call(monkeypatch, Crash(), call)
+    with pytest.raises(Crash):
+        inject.apply_translation(_data_holder(mod_path))
+    monkeypatch.undo()
+    assert os.path.exists(os.path.join(mod_path, "translate", "apply.pending"))
+
+    translate_file = os.path.join(os.path.dirname(mod_path), "mod.translate")
+    inject.write_translates(translate_file, {category: group.items() for category, group in TRANSLATES.items()})
+    assert cli.main(["--no-cache", "coverage", mod_path, translate_file]) == 0
+
+    _assert_untouched(mod_path, files)
+
+
+def test_torn_pending_marker_is_dropped(mod):
+    mod_path, files = mod
+    inject.make_translate_dir(mod_path)
+    with open(os.path.join(mod_path, "translate", "apply.pending"), "w", encoding="utf-8") as file:
+        file.write('["data')
+
+    assert inject.recover_apply(mod_path)
+    assert not inject.recover_apply(mod_path)
+    _assert_untouched(mod_path, files)
+
+
+def test_recover_without_pending_apply_leaves_the_mod_alone(mod):
+    mod_path, files = mod
+    assert not inject.recover_apply(mod_path)
+    assert not os.path.exists(os.path.join(mod_path, "translate"))
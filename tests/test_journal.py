@@ -0,0 +1,25 @@
+import builtins
+
+from journal import TranslationJournal
+
+
+def test_compact_keeps_recording_when_reopen_fails(tmp_path, monkeypatch):
+    journal = TranslationJournal(str(tmp_path), compact_after=100)
+    journal.recover()
+    journal.record("WEAPON", "gun", {"name": "枪"})
+
+    def failing_open(path, mode="r", *args, **kwargs):
+        if path == journal.journal_path and mode == "ab":
+            raise PermissionError(path)
+        return builtins.open(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr("journal.open", failing_open, raising=False)
+    journal.compact()
+    monkeypatch.undo()
+    journal.record("WEAPON", "cannon", {"name": "炮"})
+    journal.compact()
+    journal.record("WEAPON", "laser", {"name": "激光"})
+    journal.close()
+
+    translates = TranslationJournal(str(tmp_path)).recover()
+    assert translates["WEAPON"] == {"gun": {"name": "枪"}, "cannon": {"name": "炮"}, "laser": {"name": "激光"}}
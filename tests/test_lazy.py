@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from lazy import LazyEntities
+from loader import ModLoader
+from parse import ModParser
+
+WEAPON_HEADERS = ["name", "id", "tier", "range", "damage/shot", "hints", "tags", "tech/manufacturer",
+                  "for weapon tooltip>>", "primaryRoleStr", "speedStr", "trackingStr", "turnRateStr", "accuracyStr",
+                  "customPrimary", "customPrimaryHL", "customAncillary", "customAncillaryHL", "number"]
+
+
+def _write(path, lines, encoding="utf-8"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding=encoding, newline="") as file:
+        file.write("".join(line + "\r\n" for line in lines))
+
+
+@pytest.fixture
+def unindexable_mod(tmp_path, monkeypatch):
+    """
+    Indexable weapon_data.csv, descriptions.csv in utf-16 which row_index can't read.
+    """
+    monkeypatch.setattr(ModParser, "cache", None)
+    mod_path = str(tmp_path)
+    _write(os.path.join(mod_path, "data", "strings", "descriptions.csv"), [
+        "id,type,text1,text2,text3,text4,notes",
+        "gun,WEAPON,gun text,,,,",
+        "cannon,WEAPON,cannon text,,,,",
+    ], "utf-16")
+    _write(os.path.join(mod_path, "data", "weapons", "weapon_data.csv"), [
+        ",".join(WEAPON_HEADERS),
+        "Gun,gun,1,500,10,,,Common,,Assault,Fast,Good,Fast,High,,,,,1",
+        "Cannon,cannon,1,500,10,,,Common,,Assault,Fast,Good,Fast,High,,,,,2",
+    ])
+    return mod_path
+
+
+def test_unindexable_descriptions_are_parsed_once_on_load(unindexable_mod, monkeypatch):
+    weapons = ModLoader(lazy=True).parse(unindexable_mod, ["weapons"])["weapons"]
+    assert isinstance(weapons, LazyEntities)
+
+    def unexpected(*args):
+        raise AssertionError("descriptions.csv read after the load")
+
+    monkeypatch.setattr(ModParser, "read_description", unexpected)
+    monkeypatch.setattr(ModParser, "parse_descriptions", unexpected)
+    assert weapons["gun"].description == "gun text"
+    assert weapons["cannon"].description == "cannon text"
+
+
+def test_given_descriptions_skip_the_description_index(unindexable_mod, monkeypatch):
+    row_index = ModParser.row_index
+    tables = []
+    monkeypatch.setattr(ModParser, "row_index",
+                        lambda table, mod_path: tables.append(table.kind) or row_index(table, mod_path))
+
+    weapons = ModLoader(lazy=True).parse(unindexable_mod, ["weapons"], descriptions={})["weapons"]
+
+    assert tables == ["WEAPON"]
+    assert weapons["gun"].description == ""
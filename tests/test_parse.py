@@ -0,0 +1,84 @@
+import csv
+import os
+
+import pytest
+
+from parse import ModParser
+from table import DESCRIPTION_TABLE
+
+WEAPON_HEADERS = ["name", "id", "tier", "range", "damage/shot", "hints", "tags", "tech/manufacturer",
+                  "for weapon tooltip>>", "primaryRoleStr", "speedStr", "trackingStr", "turnRateStr", "accuracyStr",
+                  "customPrimary", "customPrimaryHL", "customAncillary", "customAncillaryHL", "number"]
+
+
+def _write_csv(path, rows):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        csv.writer(file, lineterminator="\r\n").writerows(rows)
+
+
+@pytest.fixture
+def crlf_mod(tmp_path, monkeypatch):
+    """
+    A mod saved on Windows, crlf line breaks between and inside cells.
+    """
+    monkeypatch.setattr(ModParser, "cache", None)
+    mod_path = str(tmp_path)
+    _write_csv(os.path.join(mod_path, "data", "strings", "descriptions.csv"), [
+        ["id", "type", "text1", "text2", "text3", "text4", "notes"],
+        ["gun", "WEAPON", "para one\r\n\r\npara two", "foot\r\nnote", "", "", ""],
+        ["other", "WEAPON", "single line", "", "", "", ""],
+    ])
+    _write_csv(os.path.join(mod_path, "data", "weapons", "weapon_data.csv"), [
+        WEAPON_HEADERS,
+        ["Gun", "gun", "1", "500", "10", "", "", "Common", "", "Assault", "Fast", "Good", "Fast", "High",
+         "Deals %s damage\r\nover time", "20%", "", "", "1"],
+    ])
+    return mod_path
+
+
+def test_single_row_reads_match_full_parse(crlf_mod):
+    descriptions = ModParser.parse_descriptions(crlf_mod)["WEAPON"]
+    weapons = ModParser.parse_entities(crlf_mod, "WEAPON")
+
+    assert descriptions["gun"]["description"] == "para one\n\npara two"
+    for entity_id, description in descriptions.items():
+        assert ModParser.read_description(crlf_mod, "WEAPON", entity_id) == description
+    weapon = ModParser.read_entity(crlf_mod, "WEAPON", "gun")
+    for key in weapons["gun"].property_def:
+        assert getattr(weapon, key, None) == getattr(weapons["gun"], key, None), key
+
+
+def test_splice_keeps_crlf_cells_equal_to_their_translation(crlf_mod):
+    with open(os.path.join(crlf_mod, "data", "strings", "descriptions.csv"), "rb") as file:
+        data = file.read()
+    translation = dict(ModParser.parse_descriptions(crlf_mod)["WEAPON"]["gun"])
+
+    assert b"".join(DESCRIPTION_TABLE.splice(data, {"WEAPON": {"gun": translation}})) == data
+
+    translation["desc_foot_note"] = "translated"
+    spliced = b"".join(DESCRIPTION_TABLE.splice(data, {"WEAPON": {"gun": translation}}))
+    assert spliced == data.replace(b'"foot\r\nnote"', b"translated")
+
+
+def test_failed_row_index_is_not_rebuilt_until_the_file_changes(crlf_mod, monkeypatch):
+    # utf-16 is not one of INDEXABLE_ENCODINGS
+    file_path = os.path.join(crlf_mod, "data", "strings", "descriptions.csv")
+    with open(file_path, "r", encoding="utf-8", newline="") as file:
+        text = file.read()
+    with open(file_path, "w", encoding="utf-16", newline="") as file:
+        file.write(text)
+    builds = []
+    build = ModParser._ModParser__build_row_index
+    monkeypatch.setattr(ModParser, "_ModParser__build_row_index",
+                        staticmethod(lambda *args: builds.append(args) or build(*args)))
+
+    assert ModParser.row_index(DESCRIPTION_TABLE, crlf_mod) is None
+    assert ModParser.read_description(crlf_mod, "WEAPON", "other")["description"] == "single line"
+    assert ModParser.row_index(DESCRIPTION_TABLE, crlf_mod) is None
+    assert len(builds) == 1
+
+    with open(file_path, "w", encoding="utf-8", newline="") as file:
+        file.write(text)
+    assert ModParser.row_index(DESCRIPTION_TABLE, crlf_mod) is not None
+    assert len(builds) == 2
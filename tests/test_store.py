@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+import cli
+from store import TranslationStore
+
+
+@pytest.fixture
+def translates(tmp_path):
+    store = TranslationStore(str(tmp_path / "mod.translatedb"), create=True)
+    yield store.translates()
+    store.close()
+
+
+def test_missing_category_raises_key_error(translates):
+    assert translates["WEAPON"] == {}
+    assert "WEAPON" in translates
+    with pytest.raises(KeyError):
+        translates["NO_SUCH_CATEGORY"]
+    assert "NO_SUCH_CATEGORY" not in translates
+    assert translates.get("NO_SUCH_CATEGORY") is None
+    assert translates.setdefault("CUSTOM", {}) == {}
+
+
+def test_stored_extra_category_is_present(translates):
+    translates["CUSTOM"] = {"a": {"name": "甲"}}
+    assert "CUSTOM" in translates
+    assert translates["CUSTOM"]["a"] == {"name": "甲"}
+    del translates["CUSTOM"]
+    assert "CUSTOM" not in translates
+
+
+def test_missing_store_is_not_created(tmp_path):
+    missing = str(tmp_path / "missing.translatedb")
+    with pytest.raises(FileNotFoundError):
+        TranslationStore(missing)
+    with pytest.raises(FileNotFoundError):
+        cli.load_translates(missing)
+    assert cli.main(["--no-cache", "convert", missing, str(tmp_path / "out.translate")]) == 1
+    assert os.listdir(tmp_path) == []
+
+
+def test_convert_round_trip_closes_the_store(tmp_path):
+    source = str(tmp_path / "mod.translate")
+    with open(source, "w", encoding="utf-8") as file:
+        file.write('{"WEAPON": {"gun": {"name": "枪"}}, "MOD_META": {"name": "模组"}}')
+    store_path = str(tmp_path / "mod.translatedb")
+
+    assert cli.main(["--no-cache", "convert", source, store_path]) == 0
+    translates = cli.load_translates(store_path)
+
+    assert translates["WEAPON"] == {"gun": {"name": "枪"}}
+    assert translates["MOD_META"] == {"name": "模组"}
+    assert type(translates["WEAPON"]) is dict
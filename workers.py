@@ -0,0 +1,187 @@
+import logging
+import os
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, QFileSystemWatcher, pyqtSignal
+
+from lazy import LazyEntities
+from loader import ModLoader
+from prototypes import DataHolder
+
+
+class LoadSignals(QObject):
+    # part, parts done, parts total
+    progress = pyqtSignal(str, int, int)
+    # DataHolder attribute -> parsed value
+    finished = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+
+class LoadWorker(QRunnable):
+    """
+    Parses mod data on a QThreadPool thread.
+    Results are only handed over through signals, the receiver decides on the GUI thread
+    whether they still belong to the DataHolder's current mod.
+    """
+
+    def __init__(self, mod_path: str, parts: list[str], descriptions: dict | None = None):
+        super().__init__()
+        self.mod_path = mod_path
+        self.parts = parts
+        self.descriptions = descriptions
+        self.signals = LoadSignals()
+        self.__cancelled = threading.Event()
+
+    def cancel(self):
+        self.__cancelled.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self.__cancelled.is_set()
+
+    def run(self):
+        try:
+            result = ModLoader(lazy=True).parse(self.mod_path, self.parts, self.descriptions,
+                                                progress=self.__progress,
+                                                is_cancelled=self.__cancelled.is_set)
+        except Exception as e:
+            logging.exception("loading (%s) of mod(%s) failed", self.parts, self.mod_path)
+            if not self.is_cancelled:
+                self.signals.failed.emit(str(e))
+            return
+        if result is not None and not self.is_cancelled:
+            self.signals.finished.emit(result)
+
+    def __progress(self, part: str, done: int, total: int):
+        if not self.is_cancelled:
+            self.signals.progress.emit(part, done, total)
+
+
+def _entity_state(entity) -> dict:
+    if hasattr(entity, "__dict__"):
+        return vars(entity)
+    # private slots hold derived data, e.g. the rendered strings of prototypes._memoized
+    return {slot: getattr(entity, slot, None)
+            for cls in type(entity).__mro__ for slot in getattr(cls, "__slots__", ()) if not slot.startswith("_")}
+
+
+class ModFileWatcher(QObject):
+    """
+    Watches the data files of the loaded mod.
+    Only the part of the DataHolder fed by a changed file is parsed again, entity dicts are
+    patched in place of the changed entries and entities_changed tells the pages what moved.
+    """
+    # DataHolder attribute, ids added or changed, whether the id list itself changed
+    entities_changed = pyqtSignal(str, set, bool)
+    # editors often write a file in several steps, wait for them to settle
+    SETTLE_DELAY = 500
+
+    def __init__(self, data_holder: DataHolder, parent=None):
+        super().__init__(parent)
+        self.data_holder = data_holder
+        self.__watcher = QFileSystemWatcher(self)
+        self.__watcher.fileChanged.connect(self.__file_changed)
+        self.__timer = QTimer(self)
+        self.__timer.setSingleShot(True)
+        self.__timer.setInterval(ModFileWatcher.SETTLE_DELAY)
+        self.__timer.timeout.connect(self.__reload)
+        self.__pending: set[str] = set()
+        self.__worker: LoadWorker | None = None
+
+    def __watched_files(self) -> dict[str, str]:
+        data_holder = self.data_holder
+        return {
+            data_holder.description_csv_path: "descriptions",
+            data_holder.weapon_csv_path: "weapons",
+            data_holder.hull_csv_path: "ship_hulls",
+            data_holder.system_csv_path: "ship_systems",
+            data_holder.hullmod_csv_path: "hullmods",
+            data_holder.mod_info_path: "metadata",
+        }
+
+    def watch(self):
+        """
+        (Re)start watching the current mod of the DataHolder.
+        """
+        self.__timer.stop()
+        self.__pending.clear()
+        if self.__worker is not None:
+            self.__worker.cancel()
+            self.__worker = None
+        if self.__watcher.files():
+            self.__watcher.removePaths(self.__watcher.files())
+        if self.data_holder.mod_path:
+            paths = [path for path in self.__watched_files().keys() if os.path.exists(path)]
+            if paths:
+                self.__watcher.addPaths(paths)
+
+    def __file_changed(self, path: str):
+        # files replaced by rename drop out of the watch list
+        if path not in self.__watcher.files() and os.path.exists(path):
+            self.__watcher.addPath(path)
+        part = self.__watched_files().get(path)
+        if part is not None:
+            self.__pending.add(part)
+            self.__timer.start()
+
+    def __reload(self):
+        data_holder = self.data_holder
+        parts = {part for part in self.__pending if data_holder.__getattribute__(part) is not None}
+        if "descriptions" in self.__pending:
+            # description texts live on the entities, re-merge every loaded table
+            parts.update(part for part in ModLoader.DEPENDS_ON if data_holder.__getattribute__(part) is not None)
+        self.__pending.clear()
+        if not parts:
+            return
+        if self.__worker is not None:
+            self.__worker.cancel()
+        descriptions = None if "descriptions" in parts else data_holder.descriptions
+        worker = LoadWorker(data_holder.mod_path, list(parts), descriptions)
+        worker.setAutoDelete(False)
+        generation = data_holder.generation
+        worker.signals.finished.connect(lambda result: self.__reloaded(worker, generation, result))
+        self.__worker = worker
+        QThreadPool.globalInstance().start(worker)
+
+    def __reloaded(self, worker: LoadWorker, generation: int, result: dict):
+        if worker is not self.__worker or worker.is_cancelled:
+            return
+        self.__worker = None
+        data_holder = self.data_holder
+        if generation != data_holder.generation or worker.mod_path != data_holder.mod_path:
+            return
+        for part, value in result.items():
+            old = data_holder.__getattribute__(part)
+            if not value and old:
+                # most likely caught the file half written, the next change event retries
+                logging.warning("reloading %s of mod(%s) gave nothing, kept loaded data", part, worker.mod_path)
+                continue
+            if part in ModLoader.DEPENDS_ON or part == "hullmods":
+                changed, ids_changed = self.__patch(part, old, value)
+                if changed or ids_changed:
+                    self.entities_changed.emit(part, changed, ids_changed)
+            else:
+                data_holder.__setattr__(part, value)
+                if part == "metadata":
+                    self.entities_changed.emit(part, set(), False)
+
+    def __patch(self, part: str, old: dict, new: dict) -> (set, bool):
+        ids_changed = len(old) != len(new) or any(a != b for a, b in zip(old.keys(), new.keys()))
+        if isinstance(new, LazyEntities) or isinstance(old, LazyEntities):
+            # only entities already read can be on screen, compare those and take the new mapping
+            loaded = old.loaded_items() if isinstance(old, LazyEntities) else old.items()
+            changed = {entity_id for entity_id, entity in loaded
+                       if entity_id in new and _entity_state(entity) != _entity_state(new[entity_id])}
+            changed.update(entity_id for entity_id in new if entity_id not in old)
+            self.data_holder.__setattr__(part, new)
+            return changed, ids_changed
+        changed = {entity_id for entity_id, entity in new.items()
+                   if entity_id not in old or _entity_state(old[entity_id]) != _entity_state(entity)}
+        if ids_changed:
+            # keep untouched entities, take the id order of the file
+            self.data_holder.__setattr__(part, {entity_id: old[entity_id] if entity_id not in changed else entity
+                                                for entity_id, entity in new.items()})
+        else:
+            for entity_id in changed:
+                old[entity_id] = new[entity_id]
+        return changed, ids_changed